@@ -0,0 +1,191 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from startup import lazy_import
+from pixel_formats import PIXEL_FORMATS, to_bgr, to_model_input
+from capture import CameraCapture
+
+cv2 = lazy_import("cv2")
+
+
+def to_tensor(rgb):
+    """Same normalization as HailoObjectDetector._to_tensor."""
+    return rgb.transpose(2, 0, 1).astype(np.float32) * np.float32(1 / 255.0)
+
+
+def current_input(frame, input_size):
+    """The pre-native path: full-resolution BGR, resized, then converted again (HailoObjectDetector._hailo_preprocess)."""
+    img = cv2.resize(frame, (input_size, input_size))
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return to_tensor(img)
+
+
+def summarize(name, cpu_times, latencies, wall_time):
+    latencies = np.array(latencies) * 1000
+    return {
+        "path": name,
+        "frames": len(latencies),
+        "cpu_ms": float(np.mean(cpu_times)) * 1000,
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "fps": len(latencies) / wall_time if wall_time > 0 else 0.0,
+    }
+
+
+def bench_camera(camera_id, pixel_format, width, height, fps, input_size, frames, warmup, preview):
+    """
+    Capture-to-tensor latency (grab to normalized tensor) and CPU time per frame from a live camera.
+    'BGR' measures the current path; native formats measure the single-pass path. With `preview`,
+    every frame is also converted to full-resolution BGR as the preview window would need
+    (nothing is displayed).
+    """
+    camera = CameraCapture(camera_id=camera_id, width=width, height=height, fps=fps, pixel_format=pixel_format)
+    camera.initialize_camera()
+    name = pixel_format if camera.pixel_format == pixel_format else f"{pixel_format}->BGR fallback"
+    name += " +preview" if preview else ""
+    try:
+        cpu_times, latencies = [], []
+        start = None
+        while len(latencies) < frames:
+            cpu_start = time.process_time()
+            packet = camera.read_frame()
+            if packet is None:
+                continue
+            if camera.pixel_format == "BGR":
+                current_input(packet["frame"], input_size)
+            else:
+                if preview:
+                    camera.frame_bgr(packet)
+                to_tensor(camera.model_input(packet, input_size))
+            done = time.monotonic()
+            if warmup:
+                warmup -= 1
+                continue
+            start = start or packet["timestamp"]
+            cpu_times.append(time.process_time() - cpu_start)
+            latencies.append(done - packet["timestamp"])
+        return summarize(name, cpu_times, latencies, time.monotonic() - start)
+    finally:
+        camera.cleanup()
+
+
+def synthetic_frame(pixel_format, width, height):
+    """A smooth test image in the given native layout, as the driver would deliver it."""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    bgr = np.dstack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                     (x + y) / 2]).astype(np.uint8)
+    if pixel_format == "BGR":
+        return bgr
+    if pixel_format == "MJPEG":
+        return cv2.imencode(".jpg", bgr)[1]
+    yuv = cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420)  # Y plane, then U and V planes at quarter size
+    luma = yuv[:height]
+    u = yuv[height:height + height // 4].reshape(height // 2, width // 2)
+    v = yuv[height + height // 4:].reshape(height // 2, width // 2)
+    if pixel_format == "NV12":
+        return np.vstack([luma, np.dstack([u, v]).reshape(height // 2, width)])
+    # YUYV: Y0 U0 Y1 V0, chroma shared by horizontal pixel pairs
+    packed = np.empty((height, width, 2), dtype=np.uint8)
+    packed[:, :, 0] = luma
+    packed[:, 0::2, 1] = np.repeat(u, 2, axis=0)
+    packed[:, 1::2, 1] = np.repeat(v, 2, axis=0)
+    return packed
+
+
+def native_input(raw, pixel_format, width, height, input_size, preview):
+    """The pipeline's native path, with or without a preview consumer building full-resolution BGR."""
+    packet = {"raw": raw, "pixel_format": pixel_format, "shape": (height, width)}
+    if preview:
+        CameraCapture.frame_bgr(packet)
+    return to_tensor(CameraCapture.model_input(packet, input_size))
+
+
+def bench_synthetic(pixel_format, width, height, input_size, frames, preview):
+    """
+    Conversion cost only, without a camera: the current path (driver format -> full BGR -> model input)
+    against the single-pass native path, on the same frame. In the current path the preview reuses
+    the BGR frame, so `preview` only adds work to the native path.
+    """
+    raw = synthetic_frame(pixel_format, width, height)
+    results = []
+    suffix = " +preview" if preview else ""
+    paths = [
+        ("current" + suffix, lambda: current_input(to_bgr(raw, pixel_format, width, height), input_size)),
+        ("native" + suffix, lambda: native_input(raw, pixel_format, width, height, input_size, preview)),
+    ]
+    for name, convert in paths:
+        cpu_times, latencies = [], []
+        wall_start = time.monotonic()
+        for _ in range(frames):
+            cpu_start = time.process_time()
+            start = time.monotonic()
+            convert()
+            latencies.append(time.monotonic() - start)
+            cpu_times.append(time.process_time() - cpu_start)
+        results.append(summarize(f"{pixel_format} {name}", cpu_times, latencies, time.monotonic() - wall_start))
+    return results
+
+
+def format_results(results):
+    lines = [f"{'path':<32} {'frames':>7} {'cpu ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'fps':>7}"]
+    for r in results:
+        lines.append(f"{r['path']:<32} {r['frames']:>7} {r['cpu_ms']:>8.2f} {r['latency_p50_ms']:>8.2f} "
+                     f"{r['latency_p95_ms']:>8.2f} {r['fps']:>7.1f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Per-frame CPU time and capture-to-tensor latency: current BGR path vs native pixel formats.")
+    parser.add_argument("--formats", nargs="+", default=["YUYV", "NV12", "MJPEG"], choices=PIXEL_FORMATS[1:],
+                        help="Native formats to compare against the current BGR path.")
+    parser.add_argument("--camera-id", type=int, default=0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--input-size", type=int, default=640, help="Model input size.")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30, help="Frames discarded before measuring (camera only).")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Measure conversion only on generated frames, without a camera.")
+    args = parser.parse_args(argv)
+
+    # Both configurations of the pipeline: headless, and with the preview window on (the default)
+    results = []
+    for preview in (False, True):
+        if args.synthetic:
+            for pixel_format in args.formats:
+                results.extend(bench_synthetic(pixel_format, args.width, args.height, args.input_size, args.frames,
+                                               preview))
+            continue
+        for pixel_format in ["BGR", *args.formats]:
+            try:
+                results.append(bench_camera(args.camera_id, pixel_format, args.width, args.height, args.fps,
+                                            args.input_size, args.frames, args.warmup, preview))
+            except Exception as e:
+                print(f"Skipping {pixel_format}: {e}")
+    print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Notes:
+# What Is Measured:
+
+# cpu ms is process CPU time per frame (all threads, including OpenCV's), p50/p95 are capture-to-tensor
+# latency from the grab to a normalized CHW tensor, the same point where the detector starts inference.
+# With a camera, 'BGR' is the path the pipeline used before native formats: OpenCV converts every frame
+# to full-resolution BGR in retrieve(), then _hailo_preprocess resizes and converts it again.
+# --synthetic separates conversion cost from driver and USB effects when comparing formats offline.
+# Every path is measured headless and with the preview on ("+preview"), where the full-resolution BGR
+# frame is built for the window and the model input is resized from it.
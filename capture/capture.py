@@ -1,10 +1,21 @@
-import cv2
+import os
+import sys
 import time
 import threading
-from hailo_object_detector import HailoObjectDetector  # Make sure to import your detector class
+
+if __name__ == "__main__":  # Run on its own: startup.py and the detector live outside capture/
+    ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path[:0] = [ROOT_DIR, os.path.join(ROOT_DIR, "detection")]
+
+from startup import lazy_import
+from pixel_formats import FOURCC_CODES, PIXEL_FORMATS, to_bgr, to_model_input
+
+cv2 = lazy_import("cv2")
 
 class CameraCapture:
-    def __init__(self, camera_id=0, width=640, height=480, fps=30, detection_callback=None):
+    def __init__(self, camera_id=0, width=640, height=480, fps=30, detection_callback=None,
+                 window_name="Camera Feed", pixel_format="BGR", buffer_size=1,
+                 preview=None):
         """
         Initialize the camera capture settings.
 
@@ -13,15 +24,27 @@ class CameraCapture:
         :param height: Height of the video frame.
         :param fps: Frames per second.
         :param detection_callback: Callback function to process detected objects.
+        :param window_name: Title of the preview window (one per camera when running several lanes).
+        :param pixel_format: 'BGR' (OpenCV converts every frame) or a native format: 'YUYV', 'NV12' or 'MJPEG'.
+        :param buffer_size: Driver frame buffers; 1 keeps the frame handed out close to the newest one.
+        :param preview: Optional PreviewDisplay shared by several cameras; frames from `capture_and_detect`
+                        are handed to it instead of calling imshow on this camera's thread.
         """
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f"Unsupported pixel format '{pixel_format}'. Use one of {PIXEL_FORMATS}.")
         self.camera_id = camera_id
         self.width = width
         self.height = height
         self.fps = fps
         self.cap = None
         self.detection_callback = detection_callback  # Callback for HailoObjectDetector integration
+        self.window_name = window_name
+        self.pixel_format = pixel_format
+        self.buffer_size = buffer_size
+        self.preview = preview
         self.capture_thread = None
         self.running = False
+        self.frame_id = 0
 
     def initialize_camera(self):
         """
@@ -32,18 +55,110 @@ class CameraCapture:
             if not self.cap.isOpened():
                 raise Exception("Camera not detected. Please ensure the Raspberry Pi HQ Camera is connected.")
 
+            # The format has to be negotiated before the resolution, which depends on it
+            if self.pixel_format != "BGR":
+                self._negotiate_pixel_format()
+
             # Set camera properties
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
             self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
 
-            print(f"Camera initialized with resolution {self.width}x{self.height} at {self.fps} FPS.")
+            # Native frames are unpacked with the size the driver actually chose
+            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            if width and height:
+                self.width, self.height = width, height
+
+            print(f"Camera initialized with resolution {self.width}x{self.height} at {self.fps} FPS "
+                  f"({self.pixel_format}).")
 
         except Exception as e:
             print(f"Error initializing camera: {e}")
             self.cleanup()
             raise
 
+    def _negotiate_pixel_format(self):
+        """
+        Ask the driver for the native pixel format with OpenCV's own conversion disabled.
+        Falls back to BGR if the camera does not offer the format.
+        """
+        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*FOURCC_CODES[self.pixel_format]))
+        code = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        negotiated = "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+        if negotiated != FOURCC_CODES[self.pixel_format]:
+            print(f"Camera does not offer {self.pixel_format} (got '{negotiated}'). Falling back to BGR.")
+            self.pixel_format = "BGR"
+            return
+        self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+
+    def read_frame(self):
+        """
+        Read one frame for a pipeline capture stage, without converting it.
+
+        :return: Dict with "frame_id", "timestamp" (time.monotonic() at capture), "raw" (native frame),
+                 "pixel_format" and "shape" (height, width), or None on failure. BGR packets also carry "frame".
+        """
+        if not self.cap:
+            raise Exception("Camera is not initialized. Call `initialize_camera` first.")
+
+        # Timestamp at grab, before the (possibly slower) retrieve copies the buffer out
+        if not self.cap.grab():
+            print("Failed to capture frame. Retrying...")
+            return None
+        timestamp = time.monotonic()
+        ret, raw = self.cap.retrieve()
+        if not ret:
+            print("Failed to capture frame. Retrying...")
+            return None
+        self.frame_id += 1
+        packet = {"frame_id": self.frame_id, "timestamp": timestamp, "raw": raw,
+                  "pixel_format": self.pixel_format, "shape": (self.height, self.width)}
+        if self.pixel_format == "BGR":
+            packet["frame"] = raw
+        return packet
+
+    @staticmethod
+    def frame_bgr(packet):
+        """
+        Full-resolution BGR frame of a packet, converted on first use and cached in packet["frame"].
+
+        :param packet: Packet from read_frame.
+        :return: BGR frame.
+        """
+        if "frame" not in packet:
+            height, width = packet["shape"]
+            packet["frame"] = to_bgr(packet["raw"], packet["pixel_format"], width, height)
+        return packet["frame"]
+
+    @staticmethod
+    def model_input(packet, input_size):
+        """
+        Model input of a packet in one conversion-plus-resize pass from the native frame.
+
+        If the preview already built the full-resolution BGR frame, that frame is resized instead, so
+        the native frame is never color-converted twice.
+
+        :param packet: Packet from read_frame.
+        :param input_size: Square model input size.
+        :return: (input_size, input_size, 3) uint8 RGB image.
+        """
+        height, width = packet["shape"]
+        if "frame" in packet:
+            return to_model_input(packet["frame"], "BGR", width, height, input_size)
+        return to_model_input(packet["raw"], packet["pixel_format"], width, height, input_size)
+
+    def show_preview(self, frame):
+        """
+        Display a frame in the preview window.
+
+        :param frame: BGR frame.
+        :return: True if the user pressed 'q'.
+        """
+        cv2.imshow(self.window_name, frame)
+        return cv2.waitKey(1) & 0xFF == ord('q')
+
     def capture_and_detect(self):
         """
         Start capturing frames and send them to the detection callback for processing.
@@ -62,21 +177,24 @@ class CameraCapture:
         """
         print("Press 'q' to quit.")
         while self.running:
-            ret, frame = self.cap.read()
-            if not ret:
-                print("Failed to capture frame. Retrying...")
+            packet = self.read_frame()
+            if packet is None:
                 continue
+            frame = self.frame_bgr(packet)
 
             # Perform object detection using the callback
             if self.detection_callback:
                 self.detection_callback(frame)  # This will draw boxes on the frame
 
-            # Display the frame (optional)
-            cv2.imshow("Camera Feed", frame)
+            # Display the frame (optional); a shared preview owns the window and the 'q' key
+            if self.preview:
+                self.preview.submit(self.window_name, frame)
+            else:
+                cv2.imshow(self.window_name, frame)
 
-            # Quit on 'q' key press
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+                # Quit on 'q' key press
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
 
             # Add a slight delay to match the desired FPS
             time.sleep(1 / self.fps)
@@ -98,7 +216,8 @@ class CameraCapture:
             self.cap.release()
             self.cap = None
             print("Camera resource released.")
-        cv2.destroyAllWindows()
+        if not self.preview:
+            cv2.destroyAllWindows()
 
     def __del__(self):
         """
@@ -115,6 +234,8 @@ def detection_callback(frame):
     :param frame: The current frame captured from the camera.
     :return: None (frame is modified directly with bounding boxes and class labels).
     """
+    from detector import HailoObjectDetector  # Imported here so capture alone does not load the Hailo runtime
+
     # Initialize your HailoObjectDetector (make sure the .hef path is correct)
     detector = HailoObjectDetector(hailo_hef_path='/path/to/your/model.hef')
 
@@ -186,4 +307,10 @@ if __name__ == "__main__":
 # The class label and its probability (formatted to two decimal places) are displayed above the bounding box.
 # Things to Adjust:
 # Ensure that the path to the .hef model is correctly set in the HailoObjectDetector initialization (hailo_hef_path='/path/to/your/model.hef').
-# The detection output format should match what the detect_objects method of your HailoObjectDetector returns. If the structure is different, modify how bounding boxes, class names, and probabilities are accessed.
\ No newline at end of file
+# The detection output format should match what the detect_objects method of your HailoObjectDetector returns. If the structure is different, modify how bounding boxes, class names, and probabilities are accessed.
+# Native Pixel Formats:
+# With pixel_format='YUYV', 'NV12' or 'MJPEG' the driver's own format is kept (CAP_PROP_CONVERT_RGB off)
+# and read_frame() uses grab()/retrieve() with a one-frame buffer. model_input() converts straight to the
+# model's RGB input (pixel_formats.py); frame_bgr() builds full-resolution BGR only for the preview, and
+# model_input() reuses that frame when it exists. With the preview on, the native path therefore costs
+# about the same as the BGR path; the savings come with show_preview=False (see capture/bench_capture.py).
@@ -0,0 +1,86 @@
+from startup import lazy_import
+
+cv2 = lazy_import("cv2")
+
+PIXEL_FORMATS = ("BGR", "YUYV", "NV12", "MJPEG")
+FOURCC_CODES = {"YUYV": "YUYV", "NV12": "NV12", "MJPEG": "MJPG"}
+
+
+def _reduced_decode_flag(width, height, input_size):
+    """Largest JPEG DCT downscale (1/2, 1/4, 1/8) that still leaves at least `input_size` pixels."""
+    for factor, flag in ((8, "IMREAD_REDUCED_COLOR_8"), (4, "IMREAD_REDUCED_COLOR_4"), (2, "IMREAD_REDUCED_COLOR_2")):
+        if min(width, height) // factor >= input_size:
+            return getattr(cv2, flag)
+    return cv2.IMREAD_COLOR
+
+
+def to_model_input(raw, pixel_format, width, height, input_size):
+    """
+    Convert a native camera frame straight to the model's RGB input.
+
+    The native planes are resized first and the color conversion runs once at model resolution,
+    so a full-resolution BGR frame is never built.
+
+    :param raw: Frame as retrieved with CAP_PROP_CONVERT_RGB disabled (or a BGR frame for 'BGR').
+    :param pixel_format: One of PIXEL_FORMATS.
+    :param width: Capture width.
+    :param height: Capture height.
+    :param input_size: Square model input size (even).
+    :return: (input_size, input_size, 3) uint8 RGB image.
+    """
+    size = (input_size, input_size)
+    if pixel_format == "BGR":
+        return cv2.cvtColor(cv2.resize(raw, size), cv2.COLOR_BGR2RGB)
+
+    if pixel_format == "YUYV":
+        # Resize whole Y0-U-Y1-V macropixels, which keeps luma and chroma together in one contiguous pass
+        macropixels = raw.reshape(height, width // 2, 4)
+        small = cv2.resize(macropixels, (input_size // 2, input_size))
+        return cv2.cvtColor(small.reshape(input_size, input_size, 2), cv2.COLOR_YUV2RGB_YUYV)
+
+    if pixel_format == "NV12":
+        planes = raw.reshape(height * 3 // 2, width)
+        luma = cv2.resize(planes[:height], size)
+        chroma = cv2.resize(planes[height:].reshape(height // 2, width // 2, 2), (input_size // 2, input_size // 2))
+        return cv2.cvtColorTwoPlane(luma, chroma, cv2.COLOR_YUV2RGB_NV12)
+
+    if pixel_format == "MJPEG":
+        # Let the JPEG decoder skip the detail the model never sees
+        decoded = cv2.imdecode(raw.reshape(-1), _reduced_decode_flag(width, height, input_size))
+        return cv2.cvtColor(cv2.resize(decoded, size), cv2.COLOR_BGR2RGB)
+
+    raise ValueError(f"Unsupported pixel format '{pixel_format}'. Use one of {PIXEL_FORMATS}.")
+
+
+def to_bgr(raw, pixel_format, width, height):
+    """
+    Full-resolution BGR frame for preview consumers.
+
+    :param raw: Native frame (see to_model_input).
+    :param pixel_format: One of PIXEL_FORMATS.
+    :param width: Capture width.
+    :param height: Capture height.
+    :return: (height, width, 3) uint8 BGR image.
+    """
+    if pixel_format == "BGR":
+        return raw
+    if pixel_format == "YUYV":
+        return cv2.cvtColor(raw.reshape(height, width, 2), cv2.COLOR_YUV2BGR_YUYV)
+    if pixel_format == "NV12":
+        return cv2.cvtColor(raw.reshape(height * 3 // 2, width), cv2.COLOR_YUV2BGR_NV12)
+    if pixel_format == "MJPEG":
+        return cv2.imdecode(raw.reshape(-1), cv2.IMREAD_COLOR)
+    raise ValueError(f"Unsupported pixel format '{pixel_format}'. Use one of {PIXEL_FORMATS}.")
+
+
+# Notes:
+# Why Resize Before Converting:
+
+# The old path converted every 1280x720 frame to BGR, resized it, then converted again to RGB. Resizing
+# the YUYV macropixels or the NV12 Y and UV planes first means the color conversion touches 640x640 (or
+# 320x320) pixels instead of the full frame. MJPEG frames are decoded at 1/2-1/8 scale by the JPEG decoder
+# itself when the capture resolution leaves enough pixels for the model.
+# Measure with capture/bench_capture.py (--synthetic compares conversion cost without a camera).
+# Preview:
+
+# to_bgr() is only called when something actually displays the frame.
@@ -0,0 +1,60 @@
+import threading
+from startup import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+class PreviewDisplay:
+    def __init__(self, on_quit=None, interval=0.03):
+        """
+        Show preview frames from several cameras on one thread.
+
+        OpenCV's HighGUI is not thread-safe, so capture threads only hand frames over and this
+        thread owns every imshow/waitKey call. Only the newest frame per window is kept.
+
+        :param on_quit: Callable run (once) when the user presses 'q' in any preview window.
+        :param interval: Seconds between display refreshes.
+        """
+        self.on_quit = on_quit
+        self.interval = interval
+        self.frames = {}  # window name -> newest frame not shown yet
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def submit(self, window_name, frame):
+        """
+        Queue a frame for display, replacing any frame of that window not shown yet.
+
+        :param window_name: Preview window title.
+        :param frame: BGR frame.
+        """
+        with self.lock:
+            self.frames[window_name] = frame
+
+    def start(self):
+        """Start the display thread."""
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._display_loop, name="preview", daemon=True)
+        self.thread.start()
+
+    def _display_loop(self):
+        quit_requested = False
+        while not self.stop_event.wait(self.interval):
+            with self.lock:
+                frames, self.frames = self.frames, {}
+            for window_name, frame in frames.items():
+                cv2.imshow(window_name, frame)
+            if cv2.waitKey(1) & 0xFF == ord('q') and not quit_requested:
+                quit_requested = True
+                print("Preview closed by user.")
+                if self.on_quit:
+                    self.on_quit()
+        cv2.destroyAllWindows()
+
+    def stop(self):
+        """Stop the display thread and close its windows."""
+        self.stop_event.set()
+        if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
@@ -0,0 +1,179 @@
+import threading
+import time
+import queue
+from collections import deque
+
+
+class SharedBatchDetector:
+    def __init__(self, detector, max_batch_size=4, max_wait=0.005, lane_queue_size=2, result_queue_size=8):
+        """
+        Share one detector between several lanes by batching their frames.
+
+        :param detector: HailoObjectDetector (or anything with `detect_batch(frames)`).
+        :param max_batch_size: Maximum number of frames sent to the accelerator in one call.
+        :param max_wait: Seconds to wait for more lanes to contribute before running a partial batch.
+        :param lane_queue_size: Frames kept per lane; the oldest frame of that lane is dropped when full.
+        :param result_queue_size: Results kept per lane until its dispatch thread collects them.
+        """
+        self.detector = detector
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.lane_queue_size = lane_queue_size
+        self.result_queue_size = result_queue_size
+
+        self.lanes = {}  # lane_id -> {"frames", "results", "latencies", "processed", "dropped"}
+        self.lane_order = []
+        self.next_lane = 0  # Round-robin cursor so no lane always gets the first batch slot
+        self.condition = threading.Condition()
+        self.batch_sizes = deque(maxlen=256)
+        self.stop_thread = False
+        self.batch_thread = None
+
+    def register_lane(self, lane_id):
+        """
+        Register a lane and return the queue its dispatch thread reads results from.
+
+        :param lane_id: Unique lane name.
+        :return: queue.Queue of (capture_timestamp, detections) tuples.
+        """
+        with self.condition:
+            if lane_id in self.lanes:
+                raise ValueError(f"Lane '{lane_id}' is already registered.")
+            self.lanes[lane_id] = {
+                "frames": deque(maxlen=self.lane_queue_size),
+                "results": queue.Queue(maxsize=self.result_queue_size),
+                "latencies": deque(maxlen=256),
+                "processed": 0,
+                "dropped": 0,
+            }
+            self.lane_order.append(lane_id)
+            return self.lanes[lane_id]["results"]
+
+    def submit(self, lane_id, frame, timestamp=None):
+        """
+        Queue a frame for detection. Never blocks the calling capture thread.
+
+        :param lane_id: Lane the frame was captured on.
+        :param frame: BGR frame.
+        :param timestamp: Capture time from time.monotonic() (default: now).
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self.condition:
+            lane = self.lanes[lane_id]
+            if len(lane["frames"]) == lane["frames"].maxlen:
+                lane["dropped"] += 1
+            lane["frames"].append((timestamp, frame))
+            self.condition.notify()
+
+    def _pending(self):
+        return sum(len(lane["frames"]) for lane in self.lanes.values())
+
+    def _collect_batch(self):
+        """Take frames round-robin across lanes, one per lane per round, until the batch is full."""
+        batch = []
+        start = self.next_lane
+        while len(batch) < self.max_batch_size and self._pending():
+            for offset in range(len(self.lane_order)):
+                lane_id = self.lane_order[(start + offset) % len(self.lane_order)]
+                frames = self.lanes[lane_id]["frames"]
+                if frames and len(batch) < self.max_batch_size:
+                    timestamp, frame = frames.popleft()
+                    batch.append((lane_id, timestamp, frame))
+        self.next_lane = (start + 1) % max(len(self.lane_order), 1)
+        return batch
+
+    def _batch_thread(self):
+        while not self.stop_thread:
+            with self.condition:
+                while not self.stop_thread and not self._pending():
+                    self.condition.wait(timeout=0.1)
+                if self.stop_thread:
+                    break
+                # Give the other lanes a moment to fill the batch before committing to a partial one
+                deadline = time.monotonic() + self.max_wait
+                while self._pending() < self.max_batch_size and time.monotonic() < deadline:
+                    self.condition.wait(timeout=deadline - time.monotonic())
+                batch = self._collect_batch()
+
+            try:
+                results = self.detector.detect_batch([frame for _, _, frame in batch])
+            except Exception as e:
+                print(f"Error in shared detector batch: {e}")
+                continue
+
+            self.batch_sizes.append(len(batch))
+            done = time.monotonic()
+            for (lane_id, timestamp, _), detections in zip(batch, results):
+                self._deliver(lane_id, timestamp, detections, done)
+
+    def _deliver(self, lane_id, timestamp, detections, done):
+        lane = self.lanes[lane_id]
+        with self.condition:
+            lane["latencies"].append(done - timestamp)
+            lane["processed"] += 1
+        try:
+            lane["results"].put_nowait((timestamp, detections))
+        except queue.Full:
+            # A stalled lane only loses its own stale results; the batch thread never waits on it
+            try:
+                lane["results"].get_nowait()
+            except queue.Empty:
+                pass
+            lane["results"].put_nowait((timestamp, detections))
+            with self.condition:
+                lane["dropped"] += 1
+
+    def start(self):
+        """Starts the batching thread."""
+        self.stop_thread = False
+        self.batch_thread = threading.Thread(target=self._batch_thread, daemon=True)
+        self.batch_thread.start()
+
+    def stop(self):
+        """Stops the batching thread."""
+        with self.condition:
+            self.stop_thread = True
+            self.condition.notify_all()
+        if self.batch_thread:
+            self.batch_thread.join()
+
+    def lane_stats(self):
+        """
+        Per-lane latency (capture to result) and throughput counters.
+
+        :return: Dict of lane_id to stats dict (times in milliseconds).
+        """
+        stats = {}
+        with self.condition:
+            for lane_id in self.lane_order:
+                lane = self.lanes[lane_id]
+                latencies = sorted(lane["latencies"])
+                stats[lane_id] = {
+                    "processed": lane["processed"],
+                    "dropped": lane["dropped"],
+                    "latency_p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+                    "latency_p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+                    if latencies else 0.0,
+                }
+        return stats
+
+    def mean_batch_size(self):
+        """Average number of frames per accelerator call over the recent batches."""
+        with self.condition:
+            return sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0.0
+
+
+# Notes:
+# Cross-Lane Batching:
+
+# All lanes feed one SharedBatchDetector, which stacks their frames into a single detect_batch() call
+# so one accelerator serves several belts.
+# Fair Scheduling:
+
+# Batches are filled round-robin, one frame per lane per round, starting from a rotating lane.
+# Each lane keeps at most `lane_queue_size` frames, so a busy lane drops its own oldest frames
+# instead of crowding the others out.
+# Actuation Isolation:
+
+# Results go into per-lane queues with put_nowait(); every lane has its own dispatch thread and
+# sorter, so a slow lane can never delay another lane's servo timing.
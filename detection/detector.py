@@ -1,32 +1,68 @@
-import cv2
+import os
+import sys
 import numpy as np
-import hailo_platform.pyhailort as hailort
 import threading
 import queue
+import time
+
+if __name__ == "__main__":  # Run on its own: startup.py lives in the repo root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from startup import lazy_import
+
+cv2 = lazy_import("cv2")
+hailort = lazy_import("hailo_platform.pyhailort")
+
+DEFAULT_CLASS_NAMES = ["bolt", "nut", "screw_body", "screw_head"]  # Order of the trained model's class ids
+DEFAULT_CLASS_MAPPING = {
+    "bolt": "bolt",
+    "nut": "nut",
+    "screw_body": "bolt",
+    "screw_head": "bolt"
+}
 
 class HailoObjectDetector:
-    def __init__(self, hailo_hef_path, conf_threshold=0.25, iou_threshold=0.45):
+    def __init__(self, hailo_hef_path, conf_threshold=0.25, iou_threshold=0.45, class_names=None,
+                 class_mapping=DEFAULT_CLASS_MAPPING, input_size=640, hef_paths_by_size=None,
+                 load_model=True):
+        """
+        :param hailo_hef_path: Path to the compiled Hailo model.
+        :param conf_threshold: Minimum confidence for a detection to be kept.
+        :param iou_threshold: IoU threshold for Non-Maximum Suppression.
+        :param class_names: Model class names indexed by class_id (default: DEFAULT_CLASS_NAMES).
+        :param class_mapping: Dict collapsing model classes into sorting classes; None keeps model classes as-is.
+        :param input_size: Square input size of the model in `hailo_hef_path`.
+        :param hef_paths_by_size: Optional dict of extra pre-compiled models by input size (e.g. {320: 'model_320.hef'})
+                                  to switch between with `set_input_size`.
+        :param load_model: False builds a CPU-only instance for pre- and postprocessing (e.g. in evaluation
+                           worker processes) without opening the Hailo device, which one process must own.
+        """
         self.hailo_hef_path = hailo_hef_path
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
-        self.class_mapping = {
-            "bolt": "bolt",
-            "nut": "nut",
-            "screw_body": "bolt",
-            "screw_head": "bolt"
-        }
-        self._load_hailo_pipeline()
+        self.class_names = list(class_names) if class_names is not None else list(DEFAULT_CLASS_NAMES)
+        self.class_mapping = class_mapping
+        self.hef_paths_by_size = dict(hef_paths_by_size or {})
+        self.hef_paths_by_size[input_size] = hailo_hef_path
+        self.latency_by_size = {}  # Input size -> moving average of seconds per inference call
+        self.vstreams_by_size = {}
+        if load_model:
+            self._load_hailo_pipeline()
+            self.set_input_size(input_size)
 
         # Threading components
         self.frame_queue = queue.Queue(maxsize=10)  # Queue for frames to process
-        self.result_queue = queue.Queue()  # Queue for detection results
+        self.result_queue = queue.Queue(maxsize=10)  # Queue for detection results
         self.stop_thread = False
 
     def _load_hailo_pipeline(self):
         try:
-            print(f"Loading Hailo pipeline from {self.hailo_hef_path}...")
             self.device = hailort.Device()
-            self.vstreams = hailort.configure_device(self.device, self.hailo_hef_path)
+            # Configure every input size up front so switching sizes at run time is only a pointer swap
+            self.vstreams_by_size = {}
+            for size, hef_path in sorted(self.hef_paths_by_size.items()):
+                print(f"Loading Hailo pipeline from {hef_path} ({size}x{size})...")
+                self.vstreams_by_size[size] = hailort.configure_device(self.device, hef_path)
         except Exception as e:
             print(f"Error loading Hailo pipeline: {e}")
             raise
@@ -39,19 +75,54 @@ class HailoObjectDetector:
             self.device.close()
             print("Hailo device released.")
 
-    def _hailo_preprocess(self, frame):
-        img = cv2.resize(frame, (640, 640))  # Resize to model input size
+    @property
+    def input_sizes(self):
+        """Input sizes with a pre-compiled model, smallest first."""
+        return sorted(self.vstreams_by_size)
+
+    def set_input_size(self, size):
+        """
+        Switch to the pre-compiled model with the given input size.
+
+        :param size: One of `input_sizes`.
+        """
+        if size not in self.vstreams_by_size:
+            raise ValueError(f"No model compiled for input size {size}. Available: {self.input_sizes}")
+        # Swapped as one tuple so an in-flight batch never mixes one size's tensor with another's vstreams
+        self.active_model = (size, self.vstreams_by_size[size])
+
+    @property
+    def inference_latency(self):
+        """Moving average of seconds per inference call at the active input size, None until measured there."""
+        active_model = getattr(self, "active_model", None)
+        return self.latency_by_size.get(active_model[0]) if active_model else None
+
+    @property
+    def input_size(self):
+        return self.active_model[0]
+
+    def _hailo_preprocess(self, frame, input_size=640):
+        img = cv2.resize(frame, (input_size, input_size))  # Resize to model input size
         img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img = img / 255.0  # Normalize the image
-        img = img.transpose(2, 0, 1).astype(np.float32)  # Change to CHW format
-        return img
+        return self._to_tensor(img)
+
+    @staticmethod
+    def _to_tensor(rgb):
+        """Normalize an RGB uint8 image at model resolution to a CHW float32 tensor."""
+        return rgb.transpose(2, 0, 1).astype(np.float32) * np.float32(1 / 255.0)
 
     def _hailo_postprocess(self, raw_outputs, frame_shape):
+        detections = self._scale_candidates(raw_outputs, frame_shape, self.conf_threshold)
+        detections = self._apply_nms(detections)
+        return detections
+
+    def _scale_candidates(self, raw_outputs, frame_shape, conf_threshold):
+        """Convert raw outputs above `conf_threshold` to pixel-space detections, before NMS."""
         height, width = frame_shape[:2]
         detections = []
 
         for output in raw_outputs:
-            if output["confidence"] > self.conf_threshold:
+            if output["confidence"] > conf_threshold:
                 x_min, y_min, x_max, y_max = output["bbox"]
                 x_min = int(x_min * width)
                 y_min = int(y_min * height)
@@ -62,8 +133,6 @@ class HailoObjectDetector:
                     "confidence": float(output["confidence"]),
                     "bbox": [x_min, y_min, x_max, y_max],
                 })
-
-        detections = self._apply_nms(detections)
         return detections
 
     def _apply_nms(self, detections):
@@ -71,36 +140,103 @@ class HailoObjectDetector:
             return []
 
         boxes = np.array([det["bbox"] for det in detections])
+        boxes[:, 2:] -= boxes[:, :2]  # NMSBoxes expects [x, y, width, height]
         scores = np.array([det["confidence"] for det in detections])
 
         indices = cv2.dnn.NMSBoxes(boxes.tolist(), scores.tolist(), self.conf_threshold, self.iou_threshold)
 
         if indices is not None and len(indices) > 0:
-            return [detections[i[0]] for i in indices]
+            # OpenCV returns either an Nx1 or a flat array depending on the version
+            return [detections[i] for i in np.array(indices).flatten()]
         return []
 
     def _map_classes(self, detections):
         for detection in detections:
-            original_class = detection.get("class_id")
-            detection["class"] = self.class_mapping.get(original_class, "unknown")
+            class_id = detection.get("class_id")
+            class_name = self.class_names[class_id] if 0 <= class_id < len(self.class_names) else "unknown"
+            detection["class_name"] = class_name
+            if self.class_mapping is None:
+                detection["class"] = class_name
+            else:
+                detection["class"] = self.class_mapping.get(class_name, "unknown")
         return detections
 
+    def _run_inference(self, input_batch, vstreams):
+        """Run one NCHW batch through the Hailo vstreams and return one raw output list per image."""
+        raw_outputs = []
+        start = time.perf_counter()
+        with self.device:
+            for vstream in vstreams:
+                raw_outputs = vstream.write_and_read(input_batch)
+
+        latency = time.perf_counter() - start
+        # Averaged per input size: a size switch must not inherit the other model's latency
+        size = input_batch.shape[-1]
+        previous = self.latency_by_size.get(size)
+        self.latency_by_size[size] = latency if previous is None else 0.8 * previous + 0.2 * latency
+        return raw_outputs
+
+    def detect_batch(self, frames):
+        """
+        Run preprocessing, a single batched inference call and postprocessing for several frames.
+
+        :param frames: List of BGR frames, possibly from different cameras and resolutions.
+        :return: List of detection lists, in the same order as `frames`.
+        """
+        input_size, vstreams = self.active_model
+        input_batch = np.stack([self._hailo_preprocess(frame, input_size) for frame in frames])
+        raw_batch = self._run_inference(input_batch, vstreams)
+
+        results = []
+        for raw_outputs, frame in zip(raw_batch, frames):
+            detections = self._hailo_postprocess(raw_outputs, frame.shape)
+            results.append(self._map_classes(detections))
+        return results
+
+    def detect_prepared(self, images, frame_shapes):
+        """
+        Like detect_batch, for frames already converted to model input by the capture side.
+
+        :param images: List of RGB uint8 images at the active input size (see pixel_formats.to_model_input).
+        :param frame_shapes: Capture (height, width) of each image, used to scale boxes back to pixels.
+        :return: List of detection lists, in the same order as `images`.
+        """
+        input_size, vstreams = self.active_model
+        # An image converted just before an input size switch is resized rather than rejected
+        input_batch = np.stack([
+            self._to_tensor(image if image.shape[0] == input_size else cv2.resize(image, (input_size, input_size)))
+            for image in images
+        ])
+        raw_batch = self._run_inference(input_batch, vstreams)
+
+        results = []
+        for raw_outputs, frame_shape in zip(raw_batch, frame_shapes):
+            detections = self._hailo_postprocess(raw_outputs, frame_shape)
+            results.append(self._map_classes(detections))
+        return results
+
     def _inference_thread(self):
         """Thread that handles inference."""
         while not self.stop_thread:
-            if not self.frame_queue.empty():
-                frame = self.frame_queue.get()
-                input_tensor = self._hailo_preprocess(frame)
-
-                raw_outputs = []
-                with self.device:
-                    for vstream in self.vstreams:
-                        raw_outputs = vstream.write_and_read(input_tensor)
+            try:
+                frame = self.frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            detections = self.detect_batch([frame])[0]
 
-                detections = self._hailo_postprocess(raw_outputs, frame.shape)
-                detections = self._map_classes(detections)
+            self._put_latest(self.result_queue, detections)  # Add results to the queue
 
-                self.result_queue.put(detections)  # Add results to the queue
+    @staticmethod
+    def _put_latest(bounded_queue, item):
+        """Put without blocking, evicting the oldest entry when the queue is full."""
+        try:
+            bounded_queue.put_nowait(item)
+        except queue.Full:
+            try:
+                bounded_queue.get_nowait()
+            except queue.Empty:
+                pass
+            bounded_queue.put_nowait(item)
 
     def start_inference(self):
         """Starts the inference thread."""
@@ -115,7 +251,7 @@ class HailoObjectDetector:
 
     def detect_objects(self, frame):
         """Detect objects using Hailo and return detection results."""
-        self.frame_queue.put(frame)  # Put the frame into the processing queue
+        self._put_latest(self.frame_queue, frame)  # Never block the capture thread on a busy detector
         if not self.result_queue.empty():
             detections = self.result_queue.get()  # Get results from the result queue
             detected_classes = [detection["class"] for detection in detections]
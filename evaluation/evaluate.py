@@ -0,0 +1,468 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT_DIR, os.path.join(ROOT_DIR, "detection"), os.path.join(ROOT_DIR, "capture")):
+    sys.path.insert(0, path)
+
+from startup import lazy_import
+from pixel_formats import to_model_input
+
+cv2 = lazy_import("cv2")
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)  # COCO-style mAP@0.5:0.95
+STAGES = ("load", "preprocess", "inference", "postprocess")
+
+
+def load_dataset(split_dir, max_images=None):
+    """
+    List the images of a YOLO-format split (`<split>/images/*.jpg` with `<split>/labels/*.txt`).
+
+    :param split_dir: Directory containing `images` and `labels`.
+    :param max_images: Optional limit for quick runs.
+    :return: Sorted list of (image_path, label_path) tuples.
+    """
+    images_dir = os.path.join(split_dir, "images")
+    labels_dir = os.path.join(split_dir, "labels")
+    if not os.path.isdir(images_dir):
+        raise FileNotFoundError(f"No images directory in {split_dir}.")
+
+    samples = []
+    for file_name in sorted(os.listdir(images_dir)):
+        stem, extension = os.path.splitext(file_name)
+        if extension.lower() in IMAGE_EXTENSIONS:
+            samples.append((os.path.join(images_dir, file_name), os.path.join(labels_dir, stem + ".txt")))
+    return samples[:max_images] if max_images else samples
+
+
+def load_labels(label_path, image_shape):
+    """
+    Read YOLO labels ("class cx cy w h", normalized) as pixel boxes.
+
+    :param label_path: Path to the label file (a missing file means no objects).
+    :param image_shape: (height, width) of the image.
+    :return: (N, 5) array of [class_id, x_min, y_min, x_max, y_max].
+    """
+    if not os.path.exists(label_path) or os.path.getsize(label_path) == 0:
+        return np.zeros((0, 5))
+    data = np.loadtxt(label_path, ndmin=2)[:, :5]
+    height, width = image_shape
+    cx, cy, w, h = data[:, 1] * width, data[:, 2] * height, data[:, 3] * width, data[:, 4] * height
+    return np.stack([data[:, 0], cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+
+def box_iou(boxes_a, boxes_b):
+    """
+    Pairwise IoU of two sets of [x_min, y_min, x_max, y_max] boxes.
+
+    :return: (len(boxes_a), len(boxes_b)) array.
+    """
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (boxes_a[:, 2:] - boxes_a[:, :2]).prod(axis=1)
+    area_b = (boxes_b[:, 2:] - boxes_b[:, :2]).prod(axis=1)
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection + 1e-9)
+
+
+def nms(boxes, scores, iou_threshold):
+    """
+    Class-agnostic Non-Maximum Suppression, matching the detector's cv2.dnn.NMSBoxes call.
+
+    :return: Indices of the kept boxes.
+    """
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        overlaps = box_iou(boxes[best:best + 1], boxes[order[1:]])[0]
+        order = order[1:][overlaps <= iou_threshold]
+    return np.array(keep, dtype=int)
+
+
+def match_predictions(predictions, ground_truth, iou_thresholds=IOU_THRESHOLDS):
+    """
+    Mark predictions as true positives at each IoU threshold, COCO-style: in descending confidence
+    order, each prediction takes the best-overlapping ground-truth box not matched yet.
+
+    :param predictions: (N, 6) array of [x_min, y_min, x_max, y_max, confidence, class_id].
+    :param ground_truth: (M, 5) array of [class_id, x_min, y_min, x_max, y_max].
+    :return: (N, len(iou_thresholds)) boolean array.
+    """
+    true_positives = np.zeros((len(predictions), len(iou_thresholds)), dtype=bool)
+    if not len(predictions) or not len(ground_truth):
+        return true_positives
+
+    # IoU of every prediction with every ground-truth box, zeroed where the classes differ
+    iou = box_iou(predictions[:, :4], ground_truth[:, 1:5])
+    iou *= predictions[:, 5:6] == ground_truth[None, :, 0]
+
+    # A lower-confidence duplicate must never take the box from the top-scoring prediction
+    order = np.argsort(-predictions[:, 4], kind="stable")
+    for index, threshold in enumerate(iou_thresholds):
+        available = np.ones(len(ground_truth), dtype=bool)
+        for prediction in order:
+            overlaps = np.where(available, iou[prediction], -1.0)
+            best = overlaps.argmax()
+            if overlaps[best] >= threshold:
+                available[best] = False
+                true_positives[prediction, index] = True
+    return true_positives
+
+
+def average_precision(recall, precision):
+    """
+    101-point interpolated average precision (COCO convention).
+
+    :param recall: Non-decreasing recall after each prediction, by descending confidence.
+    :param precision: Precision after each prediction.
+    """
+    envelope = np.flip(np.maximum.accumulate(np.flip(precision)))  # Best precision at this recall or higher
+    index = np.searchsorted(recall, np.linspace(0, 1, 101), side="left")
+    reached = index < len(recall)
+    return float(np.where(reached, envelope[np.minimum(index, len(recall) - 1)], 0.0).mean())
+
+
+def compute_metrics(true_positives, confidences, predicted_classes, gt_classes, num_classes):
+    """
+    mAP, precision and recall from the matched predictions of a whole dataset.
+
+    :return: Dict with "map50", "map", "precision", "recall" and per-class "ap50".
+    """
+    order = np.argsort(-confidences)
+    true_positives, predicted_classes = true_positives[order], predicted_classes[order]
+
+    ap = np.full((num_classes, len(IOU_THRESHOLDS)), np.nan)
+    for class_id in range(num_classes):
+        num_gt = int((gt_classes == class_id).sum())
+        if num_gt == 0:
+            continue  # Classes absent from the dataset do not count towards mAP
+        class_tp = true_positives[predicted_classes == class_id]
+        if not len(class_tp):
+            ap[class_id] = 0.0
+            continue
+        tp_cumulative = class_tp.cumsum(axis=0)
+        fp_cumulative = (~class_tp).cumsum(axis=0)
+        recall = tp_cumulative / num_gt
+        precision = tp_cumulative / (tp_cumulative + fp_cumulative)
+        for index in range(len(IOU_THRESHOLDS)):
+            ap[class_id, index] = average_precision(recall[:, index], precision[:, index])
+
+    present = ~np.isnan(ap[:, 0])
+    matched = int(true_positives[:, 0].sum())
+    return {
+        "map50": float(ap[present, 0].mean()) if present.any() else 0.0,
+        "map": float(ap[present].mean()) if present.any() else 0.0,
+        "precision": matched / len(true_positives) if len(true_positives) else 0.0,
+        "recall": matched / len(gt_classes) if len(gt_classes) else 0.0,
+        "ap50": {int(class_id): float(ap[class_id, 0]) for class_id in np.nonzero(present)[0]},
+    }
+
+
+_worker_detector = None
+
+
+def _init_worker(conf_threshold, iou_threshold):
+    """Build a CPU-only detector once per worker process; only the parent process opens the device."""
+    global _worker_detector
+    from detector import HailoObjectDetector
+
+    _worker_detector = HailoObjectDetector(None, conf_threshold, iou_threshold, load_model=False)
+
+
+def _warm_up(_):
+    return _worker_detector is not None
+
+
+def _prepare_image(image_path, input_size):
+    """
+    Load one image and convert it to model input with the live capture code in a worker process.
+
+    The uint8 RGB image is a quarter of the size of the float32 tensor, so it is what crosses the
+    process boundary; the main process normalizes it, as the detector does for the live path.
+
+    :return: (image_path, image_shape, image, load_seconds, preprocess_seconds).
+    """
+    start = time.perf_counter()
+    frame = cv2.imread(image_path)
+    loaded = time.perf_counter()
+    height, width = frame.shape[:2]
+    image = to_model_input(frame, "BGR", width, height, input_size)
+    preprocessed = time.perf_counter()
+    return image_path, (height, width), image, loaded - start, preprocessed - loaded
+
+
+def _postprocess_image(image_path, image_shape, raw_outputs, min_conf, stage_seconds):
+    """
+    Postprocess one image's raw outputs in a worker process.
+
+    :param stage_seconds: (load, preprocess, inference) seconds measured so far.
+    :return: (image_path, image_shape, candidates, stage_seconds); candidates are all pre-NMS
+             boxes above `min_conf`, so thresholds can be swept without re-running inference.
+    """
+    detector = _worker_detector
+    start = time.perf_counter()
+    detector._hailo_postprocess(raw_outputs, image_shape)  # Timed at the live thresholds
+    postprocessed = time.perf_counter()
+
+    candidates = detector._scale_candidates(raw_outputs, image_shape, min_conf)
+    candidates = np.array([det["bbox"] + [det["confidence"], det["class_id"]] for det in candidates],
+                          dtype=np.float64).reshape(-1, 6)
+    return image_path, image_shape, candidates, (*stage_seconds, postprocessed - start)
+
+
+def _run_images(pool, detector, samples, input_size, min_conf, prefetch):
+    """
+    Overlap worker-side loading, preprocessing and postprocessing with inference in this process,
+    which owns the accelerator. At most `prefetch` preprocessed images wait for inference.
+
+    :return: List of `_postprocess_image` results in dataset order.
+    """
+    vstreams = detector.vstreams_by_size[input_size]
+    image_paths = iter([image_path for image_path, _ in samples])
+    prepared = deque()
+    postprocessed = []
+
+    def fill():
+        while len(prepared) < prefetch:
+            image_path = next(image_paths, None)
+            if image_path is None:
+                return
+            prepared.append(pool.submit(_prepare_image, image_path, input_size))
+
+    fill()
+    while prepared:
+        image_path, image_shape, image, load_seconds, preprocess_seconds = prepared.popleft().result()
+        fill()
+        start = time.perf_counter()
+        input_tensor = detector._to_tensor(image)
+        normalized = time.perf_counter()
+        raw_outputs = detector._run_inference(input_tensor[None], vstreams)[0]
+        inference_seconds = time.perf_counter() - normalized
+        preprocess_seconds += normalized - start
+        postprocessed.append(pool.submit(_postprocess_image, image_path, image_shape, raw_outputs, min_conf,
+                                         (load_seconds, preprocess_seconds, inference_seconds)))
+    return [future.result() for future in postprocessed]
+
+
+def evaluate_thresholds(image_results, ground_truth, conf_threshold, iou_threshold, num_classes):
+    """
+    Apply one confidence/IoU threshold pair to cached candidates and score them.
+
+    :param image_results: List of (image_path, candidates) tuples.
+    :param ground_truth: Dict of image_path to labels from `load_labels`.
+    :return: Metrics dict from `compute_metrics`.
+    """
+    all_tp, all_conf, all_cls, all_gt = [], [], [], []
+    for image_path, candidates in image_results:
+        predictions = candidates[candidates[:, 4] > conf_threshold]
+        if len(predictions):
+            predictions = predictions[nms(predictions[:, :4], predictions[:, 4], iou_threshold)]
+        labels = ground_truth[image_path]
+        all_tp.append(match_predictions(predictions, labels))
+        all_conf.append(predictions[:, 4])
+        all_cls.append(predictions[:, 5])
+        all_gt.append(labels[:, 0])
+
+    return compute_metrics(np.concatenate(all_tp), np.concatenate(all_conf), np.concatenate(all_cls),
+                           np.concatenate(all_gt), num_classes)
+
+
+def summarize_latency(stage_seconds):
+    """
+    Mean and p95 milliseconds per pipeline stage.
+
+    :param stage_seconds: (N, len(STAGES)) array.
+    """
+    return {
+        stage: {
+            "mean_ms": float(stage_seconds[:, index].mean() * 1000),
+            "p95_ms": float(np.percentile(stage_seconds[:, index], 95) * 1000),
+        }
+        for index, stage in enumerate(STAGES)
+    }
+
+
+def run_sweep(samples, hef_paths_by_size, input_sizes, conf_thresholds, iou_thresholds, workers, num_classes):
+    """
+    Run inference once per input size, then score every threshold pair.
+
+    Inference runs in this process, the only one that opens the accelerator; `workers` processes
+    load, preprocess and postprocess images around it.
+
+    :return: List of result dicts, one per (input_size, conf, iou) configuration.
+    """
+    from detector import HailoObjectDetector
+
+    min_conf = min(conf_thresholds)
+    largest = max(hef_paths_by_size)
+    detector = HailoObjectDetector(hef_paths_by_size[largest], conf_thresholds[0], iou_thresholds[0],
+                                   input_size=largest, hef_paths_by_size=hef_paths_by_size)
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(conf_thresholds[0], iou_thresholds[0])) as pool:
+            list(pool.map(_warm_up, range(workers)))  # Keep process start-up out of the throughput numbers
+
+            for input_size in input_sizes:
+                results.extend(_score_input_size(pool, detector, samples, input_size, conf_thresholds,
+                                                 iou_thresholds, workers, num_classes, min_conf))
+    finally:
+        detector.cleanup()
+    return results
+
+
+def _score_input_size(pool, detector, samples, input_size, conf_thresholds, iou_thresholds, workers,
+                      num_classes, min_conf):
+    """
+    One inference pass over the dataset at `input_size`, scored at every threshold pair.
+
+    :return: List of result dicts, one per (conf, iou) pair.
+    """
+    print(f"Running {len(samples)} images at {input_size}x{input_size} with {workers} CPU workers...")
+    start = time.perf_counter()
+    outputs = _run_images(pool, detector, samples, input_size, min_conf, prefetch=2 * workers)
+    wall_time = time.perf_counter() - start
+
+    label_paths = dict(samples)
+    ground_truth = {image_path: load_labels(label_paths[image_path], shape) for image_path, shape, _, _ in outputs}
+    image_results = [(image_path, candidates) for image_path, _, candidates, _ in outputs]
+    latency = summarize_latency(np.array([stage_seconds for _, _, _, stage_seconds in outputs]))
+
+    results = []
+    for conf_threshold in conf_thresholds:
+        for iou_threshold in iou_thresholds:
+            metrics = evaluate_thresholds(image_results, ground_truth, conf_threshold, iou_threshold, num_classes)
+            results.append({
+                "input_size": input_size,
+                "conf_threshold": conf_threshold,
+                "iou_threshold": iou_threshold,
+                "images_per_second": len(samples) / wall_time,
+                "latency": latency,
+                **metrics,
+            })
+    return results
+
+
+def select_fastest(results, target, metric="map50"):
+    """
+    Fastest configuration whose `metric` reaches `target` (higher metric breaks ties).
+
+    :return: Result dict, or None if no configuration meets the target.
+    """
+    passing = [result for result in results if result[metric] >= target]
+    if not passing:
+        return None
+    return max(passing, key=lambda result: (result["images_per_second"], result[metric]))
+
+
+def format_results(results, class_names):
+    lines = [f"{'size':>5} {'conf':>5} {'iou':>5} {'mAP50':>6} {'mAP':>6} {'P':>6} {'R':>6} {'img/s':>7} "
+             f"{'load':>7} {'pre':>7} {'infer':>7} {'post':>7}"]
+    for r in results:
+        latency = r["latency"]
+        lines.append(f"{r['input_size']:>5} {r['conf_threshold']:>5.2f} {r['iou_threshold']:>5.2f} "
+                     f"{r['map50']:>6.3f} {r['map']:>6.3f} {r['precision']:>6.3f} {r['recall']:>6.3f} "
+                     f"{r['images_per_second']:>7.1f} "
+                     + " ".join(f"{latency[stage]['mean_ms']:>5.1f}ms" for stage in STAGES))
+    best = max(results, key=lambda result: result["map50"])
+    lines.append("AP50 per class (best mAP50 configuration): " + ", ".join(
+        f"{class_names[c] if c < len(class_names) else c}={ap:.3f}" for c, ap in best["ap50"].items()))
+    return "\n".join(lines)
+
+
+def parse_size_paths(values):
+    hef_paths_by_size = {}
+    for value in values:
+        size, _, path = value.partition("=")
+        if not path:
+            raise argparse.ArgumentTypeError(f"Expected SIZE=PATH, got '{value}'.")
+        hef_paths_by_size[int(size)] = path
+    return hef_paths_by_size
+
+
+def main(argv=None):
+    from detector import DEFAULT_CLASS_NAMES
+
+    parser = argparse.ArgumentParser(description="Offline detector accuracy and throughput evaluation.")
+    parser.add_argument("dataset", help="YOLO-format split directory with images/ and labels/ (e.g. dataset/test).")
+    parser.add_argument("--hef", default="model.hef", help="Model compiled for 640x640 input.")
+    parser.add_argument("--hef-by-size", nargs="*", default=[], metavar="SIZE=PATH",
+                        help="Extra pre-compiled models, e.g. 320=model_320.hef 480=model_480.hef.")
+    parser.add_argument("--sizes", nargs="*", type=int, help="Input sizes to evaluate (default: all available).")
+    parser.add_argument("--conf", nargs="*", type=float, default=[0.25], help="Confidence thresholds to sweep.")
+    parser.add_argument("--iou", nargs="*", type=float, default=[0.45], help="NMS IoU thresholds to sweep.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="CPU worker processes for loading, preprocessing and postprocessing; "
+                             "inference always runs in the main process, which owns the accelerator.")
+    parser.add_argument("--target", type=float, help="Accuracy target; report the fastest configuration reaching it.")
+    parser.add_argument("--target-metric", choices=("map50", "map", "precision", "recall"), default="map50")
+    parser.add_argument("--class-names", nargs="*", default=DEFAULT_CLASS_NAMES, help="Model class names by id.")
+    parser.add_argument("--max-images", type=int, help="Only evaluate the first N images.")
+    parser.add_argument("--output", help="Write all results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    hef_paths_by_size = {640: args.hef, **parse_size_paths(args.hef_by_size)}
+    input_sizes = sorted(args.sizes or hef_paths_by_size)
+    missing = [size for size in input_sizes if size not in hef_paths_by_size]
+    if missing:
+        parser.error(f"No model for input sizes {missing}; pass them with --hef-by-size.")
+
+    samples = load_dataset(args.dataset, args.max_images)
+    if not samples:
+        parser.error(f"No images found in {args.dataset}.")
+    print(f"Evaluating {len(samples)} images from {args.dataset}.")
+
+    results = run_sweep(samples, hef_paths_by_size, input_sizes, sorted(args.conf), sorted(args.iou),
+                        args.workers, num_classes=len(args.class_names))
+    print(format_results(results, args.class_names))
+
+    if args.target is not None:
+        best = select_fastest(results, args.target, args.target_metric)
+        if best:
+            print(f"Fastest configuration with {args.target_metric} >= {args.target}: "
+                  f"input {best['input_size']}, conf {best['conf_threshold']}, iou {best['iou_threshold']} "
+                  f"({best['images_per_second']:.1f} img/s, {args.target_metric} {best[args.target_metric]:.3f})")
+        else:
+            print(f"No configuration reached {args.target_metric} >= {args.target}.")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"Results written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Notes:
+# Usage:
+
+# python evaluation/evaluate.py dataset/test --hef model.hef --hef-by-size 320=model_320.hef 480=model_480.hef \
+#     --conf 0.25 0.35 0.5 --iou 0.45 0.6 --target 0.9
+# Live Code Path:
+
+# Images go through what the belt runs, not a re-implementation: pixel_formats.to_model_input (the capture
+# side's conversion, for a BGR frame), then the detector's _to_tensor, _run_inference and _hailo_postprocess,
+# as in HailoObjectDetector.detect_prepared. Native camera formats (YUYV, NV12, MJPEG) are converted
+# differently before that point; a dataset of stored images can only exercise the BGR conversion.
+# Only the uint8 model-size image is sent between processes; normalization happens in the main process.
+# One Device Owner:
+
+# There is a single accelerator, so only the main process opens it (one HailoObjectDetector) and runs
+# inference image by image, as on the belt. Worker processes hold CPU-only detectors (load_model=False)
+# and load, preprocess and postprocess images around it, with a bounded number of images prefetched.
+# One Inference Pass per Input Size:
+
+# Candidates above the lowest swept confidence are kept before NMS, so every conf/IoU pair is scored
+# from the same inference results; only the input size needs another pass over the dataset.
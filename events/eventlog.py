@@ -0,0 +1,248 @@
+import itertools
+import os
+import re
+import struct
+import threading
+import time
+
+import numpy as np
+
+# One fixed-size little-endian record per detection: a part seen in several frames (observations_per_part)
+# is logged, and actuated for, once per frame; its records share a part_id. Keep RECORD_STRUCT and
+# RECORD_FIELDS in sync; bump LOG_VERSION (and the segment prefix) when the layout changes.
+LOG_VERSION = 2
+RECORD_STRUCT = struct.Struct("<QQdddfhhhhHBB")
+RECORD_FIELDS = [
+    ("frame_id", "<u8"),
+    ("part_id", "<u8"),         # Same for every observation of one part, 0 if not tracked
+    ("capture_time", "<f8"),    # Epoch seconds when the frame was captured
+    ("scheduled_time", "<f8"),  # Epoch seconds the part was due at its gate
+    ("actual_time", "<f8"),     # Epoch seconds the gate was in position (NaN if it never was)
+    ("confidence", "<f4"),
+    ("bbox", "<i2", (4,)),      # x_min, y_min, x_max, y_max in pixels
+    ("class_id", "<u2"),
+    ("gate", "<u1"),            # Gate index, NO_GATE for parts without a route
+    ("status", "<u1"),
+]
+RECORD_SIZE = RECORD_STRUCT.size
+
+# Lateness is not judged when logging: actuators aim to settle exactly at scheduled_time, so the query
+# compares actual_time to it with a tolerance (events/query.py --late-tolerance).
+STATUS_SORTED = 0  # Gate was commanded; see actual_time for when it was in position
+STATUS_MISSED = 1  # Gate never got into position (actuation dropped or gate closed), actual_time is NaN
+STATUS_PASSED = 2  # No route for this class; the part went to the end of the belt
+NO_GATE = 255
+
+SEGMENT_PATTERN = re.compile(rf"^events-v{LOG_VERSION}-(\d{{6}})\.bin$")
+
+
+def list_segments(directory):
+    """
+    Segment files of an event log directory, oldest first.
+
+    :param directory: Event log directory.
+    :return: List of paths.
+    """
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if SEGMENT_PATTERN.match(name))
+    return [os.path.join(directory, name) for name in names]
+
+
+class EventLogWriter:
+    def __init__(self, directory, segment_records=1_000_000, flush_interval=0.5, max_pending=100_000):
+        """
+        Append-only binary event log written in batches by a background thread.
+
+        :param directory: Directory for the segment files (created if missing).
+        :param segment_records: Records per segment file before rotating to a new one.
+        :param flush_interval: Seconds between batch writes.
+        :param max_pending: Records buffered in memory before new events are dropped (and counted).
+        """
+        self.directory = directory
+        self.segment_records = segment_records
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        os.makedirs(directory, exist_ok=True)
+
+        # Pipeline timestamps are time.monotonic(); the log stores wall-clock time for per-hour queries
+        self.wall_offset = time.time() - time.monotonic()
+
+        # Part ids start at the start-up time in microseconds, so runs sharing a directory do not collide
+        self.part_ids = itertools.count(time.time_ns() // 1000)
+
+        self.pending = []
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+        self.segment_index = self._last_segment_index()
+        self.segment_file = None
+        self.segment_count = 0
+
+        self.stop_event = threading.Event()
+        self.writer_thread = threading.Thread(target=self._writer_loop, name="event-log", daemon=True)
+        self.writer_thread.start()
+
+    def _last_segment_index(self):
+        segments = list_segments(self.directory)
+        if not segments:
+            return 0
+        return int(SEGMENT_PATTERN.match(os.path.basename(segments[-1])).group(1))
+
+    def to_wall_time(self, monotonic_time):
+        """
+        Convert a time.monotonic() timestamp to epoch seconds.
+        """
+        return monotonic_time + self.wall_offset
+
+    def new_part_id(self):
+        """
+        Allocate a part id, unique among all writers of this directory (see PartTracker).
+        """
+        with self.lock:
+            return next(self.part_ids)
+
+    def log(self, frame_id, capture_time, scheduled_time, actual_time, class_id, confidence, bbox,
+            gate=NO_GATE, status=STATUS_SORTED, part_id=0):
+        """
+        Queue one event. Cheap and non-blocking; the record is written by the background thread.
+
+        :param frame_id: Frame the part was detected in.
+        :param capture_time: time.monotonic() when the frame was captured.
+        :param scheduled_time: time.monotonic() when the part was due at its gate.
+        :param actual_time: time.monotonic() when the gate was in position, or None if it never was.
+        :param class_id: Model class id.
+        :param confidence: Detection confidence.
+        :param bbox: [x_min, y_min, x_max, y_max] in pixels.
+        :param gate: Gate index, or NO_GATE.
+        :param status: STATUS_SORTED, STATUS_MISSED or STATUS_PASSED.
+        :param part_id: Part the detection belongs to (from new_part_id), or 0 if parts are not tracked.
+        """
+        event = (frame_id, part_id, capture_time, scheduled_time, actual_time, class_id, confidence, bbox, gate,
+                 status)
+        with self.lock:
+            if len(self.pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self.pending.append(event)
+
+    def _pack(self, event):
+        frame_id, part_id, capture_time, scheduled_time, actual_time, class_id, confidence, bbox, gate, status = event
+        x_min, y_min, x_max, y_max = (max(-32768, min(32767, int(v))) for v in bbox)
+        return RECORD_STRUCT.pack(
+            frame_id,
+            part_id,
+            capture_time + self.wall_offset,
+            scheduled_time + self.wall_offset,
+            float("nan") if actual_time is None else actual_time + self.wall_offset,
+            confidence,
+            x_min, y_min, x_max, y_max,
+            class_id, gate, status,
+        )
+
+    def _open_segment(self):
+        if self.segment_file:
+            self.segment_file.close()
+        self.segment_index += 1
+        path = os.path.join(self.directory, f"events-v{LOG_VERSION}-{self.segment_index:06d}.bin")
+        self.segment_file = open(path, "ab")
+        self.segment_count = 0
+
+    def _write_batch(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        position = 0
+        while position < len(batch):
+            if self.segment_file is None or self.segment_count >= self.segment_records:
+                self._open_segment()
+            chunk = batch[position:position + self.segment_records - self.segment_count]
+            self.segment_file.write(b"".join(self._pack(event) for event in chunk))
+            self.segment_count += len(chunk)
+            position += len(chunk)
+        if batch:
+            self.segment_file.flush()
+            self.written += len(batch)
+
+    def _writer_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self._write_batch()
+            except Exception as e:
+                print(f"Error writing event log: {e}")
+        self._write_batch()
+
+    def close(self):
+        """
+        Write the remaining events and close the current segment.
+        """
+        self.stop_event.set()
+        self.writer_thread.join()
+        if self.segment_file:
+            self.segment_file.close()
+            self.segment_file = None
+        print(f"Event log closed: {self.written} events written, {self.dropped} dropped.")
+
+
+class EventLogReader:
+    def __init__(self, directory):
+        """
+        Memory-mapped, read-only view of an event log directory.
+
+        :param directory: Event log directory.
+        """
+        self.dtype = np.dtype(RECORD_FIELDS)
+        assert self.dtype.itemsize == RECORD_SIZE, "RECORD_FIELDS and RECORD_STRUCT are out of sync"
+        self.directory = directory
+        self.segments = list_segments(directory)
+
+    def iter_segments(self):
+        """
+        Yield one structured memmap per segment without reading it into memory.
+        A record cut short by a crash at the end of a segment is ignored.
+        """
+        for path in self.segments:
+            count = os.path.getsize(path) // RECORD_SIZE
+            if count:
+                yield np.memmap(path, dtype=self.dtype, mode="r", shape=(count,))
+
+    def load(self, fields=None, since=None, until=None):
+        """
+        Concatenate all segments, optionally keeping only some fields and a capture time window.
+
+        :param fields: Field names to keep (default: all).
+        :param since: Keep events captured at or after this epoch time.
+        :param until: Keep events captured before this epoch time.
+        :return: Structured numpy array.
+        """
+        parts = []
+        for records in self.iter_segments():
+            mask = np.ones(len(records), dtype=bool)
+            if since is not None:
+                mask &= records["capture_time"] >= since
+            if until is not None:
+                mask &= records["capture_time"] < until
+            selected = records[mask]
+            parts.append(selected[fields] if fields else selected)
+        if not parts:
+            return np.zeros(0, dtype=self.dtype if not fields else self.dtype[fields])
+        return np.concatenate(parts)
+
+
+# Notes:
+# Record Layout:
+
+# 56 bytes per event, no header, so a segment is just an array of records: the reader memory-maps it
+# with a numpy structured dtype and every query is a vectorized operation over columns.
+# Low Overhead:
+
+# log() only appends a tuple under a lock; packing and file writes happen in batches on the writer
+# thread every flush_interval seconds. If the disk stalls, up to max_pending events are buffered and
+# later ones are dropped and counted rather than slowing the sorting path.
+# Segment Rotation:
+
+# A new file is started every segment_records events (56 MB per million), so old shifts can be archived
+# or deleted by file.
+# Layout Versions:
+
+# Version 2 added part_id. Segments of another version have a different file prefix and are skipped by
+# the reader rather than misread.
@@ -0,0 +1,156 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from eventlog import EventLogReader, NO_GATE, STATUS_MISSED, STATUS_PASSED
+
+
+def parse_time(value):
+    """Parse an ISO date/time ("2026-10-18" or "2026-10-18T14:00") as local epoch seconds."""
+    return datetime.fromisoformat(value).timestamp()
+
+
+def missed_mask(records, late_tolerance):
+    """
+    Routed detections whose gate never got into position, or got there more than `late_tolerance` late.
+
+    :param records: Structured array from EventLogReader.load.
+    :param late_tolerance: Seconds a gate may reach position after the part is due before counting as missed.
+    :return: Boolean array over `records` (False for unrouted detections).
+    """
+    lateness = records["actual_time"] - records["scheduled_time"]
+    late = np.isnan(lateness) | (lateness > late_tolerance)
+    return (records["gate"] != NO_GATE) & ((records["status"] == STATUS_MISSED) | late)
+
+
+def part_outcomes(records, late_tolerance):
+    """
+    Collapse detections into parts: the records of one part share a part_id (records with part_id 0
+    were not tracked and count as one part each). A part is sorted if any of its observations got
+    the gate into position in time, passed if all of them were unrouted, and missed otherwise.
+
+    :param records: Structured array from EventLogReader.load.
+    :param late_tolerance: See missed_mask.
+    :return: (first_capture_time, sorted, missed, passed) arrays with one entry per part.
+    """
+    untracked = records["part_id"] == 0
+    keys = np.where(untracked, -np.arange(1, len(records) + 1), records["part_id"].astype(np.int64))
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    count = len(unique_keys)
+    first_capture = np.full(count, np.inf)
+    np.minimum.at(first_capture, inverse, records["capture_time"])
+    missed = missed_mask(records, late_tolerance)
+    passed = records["status"] == STATUS_PASSED
+    observations = np.bincount(inverse, minlength=count)
+    sorted_parts = np.bincount(inverse, weights=~missed & ~passed, minlength=count) > 0
+    passed_parts = np.bincount(inverse, weights=passed, minlength=count) == observations
+    return first_capture, sorted_parts, ~sorted_parts & ~passed_parts, passed_parts
+
+
+def hourly_throughput(records, late_tolerance):
+    """
+    Parts per wall-clock hour, by the hour each part was first seen.
+
+    :return: List of (hour_start_epoch, total, sorted, missed, passed) tuples.
+    """
+    if not len(records):
+        return []
+    first_capture, sorted_parts, missed, passed = part_outcomes(records, late_tolerance)
+    hours = (first_capture // 3600).astype(np.int64)
+    unique_hours, inverse = np.unique(hours, return_inverse=True)
+    counts = [np.bincount(inverse, minlength=len(unique_hours))]
+    for column in (sorted_parts, missed, passed):
+        counts.append(np.bincount(inverse, weights=column, minlength=len(unique_hours)))
+    return [(int(hour) * 3600, *(int(column[index]) for column in counts))
+            for index, hour in enumerate(unique_hours)]
+
+
+def latency_percentiles(values, percentiles=(50, 95, 99)):
+    """
+    Percentiles in milliseconds, ignoring NaN (never actuated) values.
+
+    :return: Dict of percentile to milliseconds, empty if there are no values.
+    """
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {}
+    return {p: float(v) * 1000 for p, v in zip(percentiles, np.percentile(values, percentiles))}
+
+
+def summarize(records, late_tolerance):
+    """
+    Latency and missed-sort statistics for routed detections, and outcomes per part.
+
+    :param records: Structured array from EventLogReader.load.
+    :param late_tolerance: Seconds a gate may reach position after the part is due before counting as missed.
+    :return: Dict of statistics.
+    """
+    routed = records[records["gate"] != NO_GATE]
+    lateness = routed["actual_time"] - routed["scheduled_time"]
+    missed = missed_mask(routed, late_tolerance)
+    _, sorted_parts, missed_parts, passed_parts = part_outcomes(records, late_tolerance)
+    return {
+        "events": len(records),
+        "parts": len(sorted_parts),
+        "sorted_parts": int(sorted_parts.sum()),
+        "missed_parts": int(missed_parts.sum()),
+        "passed_parts": int(passed_parts.sum()),
+        "routed": len(routed),
+        "missed": int(missed.sum()),
+        "missed_rate": float(missed.mean()) if len(routed) else 0.0,
+        "capture_to_actuation": latency_percentiles(routed["actual_time"] - routed["capture_time"]),
+        "actuation_lateness": latency_percentiles(lateness),
+        "per_gate": {
+            int(gate): (int((routed["gate"] == gate).sum()), int(missed[routed["gate"] == gate].sum()))
+            for gate in np.unique(routed["gate"])
+        },
+    }
+
+
+def format_percentiles(percentiles):
+    if not percentiles:
+        return "n/a"
+    return " ".join(f"p{p}={ms:.1f} ms" for p, ms in percentiles.items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput, latency and missed-sort report from a sort event log.")
+    parser.add_argument("directory", help="Event log directory (e.g. logs/events).")
+    parser.add_argument("--since", type=parse_time, help="Only events captured at or after this ISO time.")
+    parser.add_argument("--until", type=parse_time, help="Only events captured before this ISO time.")
+    parser.add_argument("--late-tolerance", type=float, default=0.05,
+                        help="Seconds a gate may be late before the part counts as missed (default: 0.05).")
+    args = parser.parse_args(argv)
+
+    reader = EventLogReader(args.directory)
+    if not reader.segments:
+        parser.error(f"No event log segments in {args.directory}.")
+    records = reader.load(since=args.since, until=args.until)
+    print(f"{len(records)} events from {len(reader.segments)} segments.")
+    if not len(records):
+        return
+
+    # Records are per detection; the hourly table counts each part (part_id) once
+    print("\nParts per hour:")
+    print(f"  {'hour':<16} {'total':>7} {'sorted':>7} {'missed':>7} {'passed':>7}")
+    for hour, total, sorted_parts, missed, passed in hourly_throughput(records, args.late_tolerance):
+        label = datetime.fromtimestamp(hour).strftime("%Y-%m-%d %H:00")
+        print(f"  {label:<16} {total:>7} {sorted_parts:>7} {missed:>7} {passed:>7}")
+
+    summary = summarize(records, args.late_tolerance)
+    print(f"\nParts: {summary['parts']} (sorted: {summary['sorted_parts']}, missed: {summary['missed_parts']}, "
+          f"passed: {summary['passed_parts']})")
+    print(f"Routed detections: {summary['routed']}, missed: {summary['missed']} ({summary['missed_rate']:.2%})")
+    print(f"Capture to gate in position: {format_percentiles(summary['capture_to_actuation'])}")
+    print(f"Gate lateness (actual - scheduled): {format_percentiles(summary['actuation_lateness'])}")
+    for gate, (count, missed) in summary["per_gate"].items():
+        print(f"  gate {gate}: {count} detections, {missed} missed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+import os
+import threading
+import queue
+import time
+
+from startup import StartupOrchestrator, lazy_import
+
+GPIO = lazy_import("RPi.GPIO")
+
+
+class Lane:
+    def __init__(self, name, camera_id=0, step_pin=17, dir_pin=27, servo_pin=18, speed=0.1,
+                 bolt_angle=90, nut_angle=0, default_angle=45, distance_to_flapper=0.5, fov_length=0.15):
+        """
+        One belt with its own camera, conveyor, sorter and dispatch thread.
+
+        :param name: Unique lane name (used in component names and statistics).
+        :param camera_id: Camera ID for this lane.
+        :param step_pin: Conveyor step GPIO pin.
+        :param dir_pin: Conveyor direction GPIO pin.
+        :param servo_pin: Flapper servo GPIO pin.
+        :param speed: Conveyor speed in m/s.
+        :param bolt_angle: Flapper angle for bolts.
+        :param nut_angle: Flapper angle for nuts.
+        :param default_angle: Flapper resting angle.
+        :param distance_to_flapper: Distance between this lane's camera and flapper in meters.
+        :param fov_length: Length of belt visible to this lane's camera in meters.
+        """
+        self.name = name
+        self.camera_id = camera_id
+        self.step_pin = step_pin
+        self.dir_pin = dir_pin
+        self.servo_pin = servo_pin
+        self.speed = speed
+        self.bolt_angle = bolt_angle
+        self.nut_angle = nut_angle
+        self.default_angle = default_angle
+        self.distance_to_flapper = distance_to_flapper
+        self.fov_length = fov_length
+
+        self.conveyor = None
+        self.camera = None
+        self.sorter = None
+        self.results = None  # Filled by SharedBatchDetector.register_lane
+        self.shared_detector_name = None
+        self.event_log_name = None
+        self.preview = None
+        self.running = False
+        self.dispatch_thread = None
+
+    def register(self, startup, shared_detector_name="detector", preview=None, event_log_name=None):
+        """
+        Register this lane's hardware with the startup orchestrator.
+
+        :param startup: StartupOrchestrator shared by all lanes.
+        :param shared_detector_name: Component name of the shared batch detector.
+        :param preview: Optional PreviewDisplay shared by all lanes' cameras.
+        :param event_log_name: Optional component name of the EventLogWriter shared by all lanes.
+        """
+        self.shared_detector_name = shared_detector_name
+        self.event_log_name = event_log_name
+        self.preview = preview
+        startup.register(f"{self.name}.conveyor", self._start_conveyor, cleanup=lambda conveyor: conveyor.stop(),
+                         resume=self._resume_conveyor)
+        startup.register(f"{self.name}.camera", self._start_camera, depends_on=(shared_detector_name,),
+                         cleanup=lambda camera: camera.stop_capture(), resume=self._resume_camera)
+        sorter_deps = (f"{self.name}.conveyor",) + ((event_log_name,) if event_log_name else ())
+        startup.register(f"{self.name}.sorter", self._start_sorter, depends_on=sorter_deps, cleanup=self._stop_sorter)
+
+    def _start_conveyor(self, deps):
+        from conveyor import ConveyorBelt
+
+        self.conveyor = ConveyorBelt(step_pin=self.step_pin, dir_pin=self.dir_pin, max_speed=1.0)
+        self.conveyor.set_speed(self.speed)
+        return self.conveyor
+
+    def _resume_conveyor(self, conveyor, previous):
+        # start() runs once per lane, so a restarted belt has to be set moving again here
+        if self.running:
+            conveyor.start(speed=previous.speed)
+
+    def _start_camera(self, deps):
+        from capture import CameraCapture
+
+        shared_detector = deps[self.shared_detector_name]
+        self.camera = CameraCapture(
+            camera_id=self.camera_id,
+            width=1280,
+            height=720,
+            fps=30,
+            detection_callback=lambda frame: shared_detector.submit(self.name, frame),
+            window_name=f"Camera Feed ({self.name})",
+            preview=self.preview,
+        )
+        self.camera.initialize_camera()
+        return self.camera
+
+    def _resume_camera(self, camera, previous):
+        if self.running:
+            camera.capture_and_detect()
+
+    def _start_sorter(self, deps):
+        from sorter import Sorter
+
+        self.sorter = Sorter(servo_pin=self.servo_pin, bolt_angle=self.bolt_angle, nut_angle=self.nut_angle,
+                             default_angle=self.default_angle, conveyor=deps[f"{self.name}.conveyor"],
+                             distance_to_flapper=self.distance_to_flapper, fov_length=self.fov_length,
+                             event_log=deps.get(self.event_log_name))
+        return self.sorter
+
+    def _stop_sorter(self, sorter):
+        self.sorter = None  # Dispatch skips parts until the restarted sorter is up
+        sorter.cleanup()
+
+    def _dispatch(self):
+        """Forward this lane's detections to its own sorter."""
+        while self.running:
+            try:
+                captured_at, detections = self.results.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            detected_classes = [detection["class"] for detection in detections]
+            if not detected_classes:
+                continue
+            print(f"[{self.name}] Detected objects: {detected_classes}")
+            # One bad detection or a sorter being restarted must not end this lane's dispatch
+            sorter, camera = self.sorter, self.camera
+            if sorter is None:
+                print(f"[{self.name}] Sorter is restarting. Skipping {detected_classes}.")
+                continue
+            try:
+                sorter.handle_detection(detected_classes, captured_at=captured_at, detections=detections,
+                                        frame_shape=(camera.height, camera.width))
+            except Exception as e:
+                print(f"[{self.name}] Error dispatching {detected_classes}: {e}")
+
+    def start(self):
+        """Start the belt, camera capture and dispatch thread of this lane."""
+        self.running = True
+        self.dispatch_thread = threading.Thread(target=self._dispatch, daemon=True)
+        self.dispatch_thread.start()
+        self.conveyor.start(speed=self.speed)
+        self.camera.capture_and_detect()
+
+    def stop(self):
+        """Stop the dispatch thread; hardware is released by the orchestrator."""
+        self.running = False
+        if self.dispatch_thread and self.dispatch_thread.is_alive():
+            self.dispatch_thread.join()
+
+
+class MultiLaneSortingSystem:
+    def __init__(self, lanes, hef_path="model.hef", max_batch_size=None, show_preview=True,
+                 event_log_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "events")):
+        """
+        Run several belts from one host, all sharing a single batched detector.
+
+        :param lanes: List of Lane instances.
+        :param hef_path: Path to the compiled Hailo model.
+        :param max_batch_size: Frames per accelerator call (default: one per lane).
+        :param show_preview: Show every lane's camera feed (press 'q' in any window to stop all lanes).
+        :param event_log_dir: Directory for the binary sort event log shared by all lanes (query it with
+                              events/query.py); None disables logging.
+        """
+        from preview import PreviewDisplay
+
+        self.lanes = lanes
+        self.lanes_by_name = {lane.name: lane for lane in lanes}
+        self.hef_path = hef_path
+        self.max_batch_size = max_batch_size or len(lanes)
+        self.event_log_dir = event_log_dir
+        self.running = False
+        self.preview = PreviewDisplay(on_quit=self._request_stop) if show_preview else None
+
+        self.startup = StartupOrchestrator()
+        self.startup.register("detector", self._start_detector, cleanup=self._stop_detector)
+        self.startup.register("event_log", self._start_event_log,
+                              cleanup=lambda event_log: event_log.close() if event_log else None)
+        for lane in self.lanes:
+            lane.register(self.startup, preview=self.preview, event_log_name="event_log")
+
+    @property
+    def shared_detector(self):
+        return self.startup.instances.get("detector")
+
+    def _start_detector(self, deps):
+        from detector import HailoObjectDetector
+        from batching import SharedBatchDetector
+
+        shared_detector = SharedBatchDetector(HailoObjectDetector(self.hef_path), max_batch_size=self.max_batch_size)
+        for lane in self.lanes:
+            lane.results = shared_detector.register_lane(lane.name)
+        shared_detector.start()
+        return shared_detector
+
+    def _start_event_log(self, deps):
+        if not self.event_log_dir:
+            return None
+        from eventlog import EventLogWriter
+
+        return EventLogWriter(self.event_log_dir)
+
+    def _stop_detector(self, shared_detector):
+        shared_detector.stop()
+        shared_detector.detector.cleanup()
+
+    def initialize_system(self):
+        """
+        Initialize the shared detector and every lane concurrently.
+        """
+        print(f"Initializing {len(self.lanes)}-lane sorting system...")
+        self.startup.start()
+        print(self.startup.report())
+
+    def print_lane_stats(self):
+        """
+        Print per-lane detection latency and drop counters.
+        """
+        shared_detector = self.shared_detector
+        if shared_detector is None:
+            print("Shared detector is restarting; no lane statistics.")
+            return
+        print(f"Mean batch size: {shared_detector.mean_batch_size():.2f}")
+        for lane_id, stats in shared_detector.lane_stats().items():
+            line = (f"  {lane_id}: processed={stats['processed']} dropped={stats['dropped']} "
+                    f"p50={stats['latency_p50_ms']:.1f} ms p95={stats['latency_p95_ms']:.1f} ms")
+            sorter = self.lanes_by_name[lane_id].sorter
+            if sorter is None:
+                line += " actuations: sorter restarting"
+            else:
+                actuation = sorter.scheduler.stats()
+                line += (f" actuations pending={actuation['depth']}/{actuation['capacity']} "
+                         f"dropped={actuation['dropped']}")
+            print(line)
+
+    def _request_stop(self):
+        self.running = False
+
+    def start_sorting(self, stats_interval=10):
+        """
+        Start all lanes and print lane statistics periodically until interrupted.
+
+        :param stats_interval: Seconds between statistics printouts.
+        """
+        self.running = True
+        print("Starting multi-lane sorting system...")
+        if self.preview:
+            self.preview.start()
+        for lane in self.lanes:
+            lane.start()
+
+        last_stats = time.monotonic()
+        try:
+            while self.running:
+                if time.monotonic() - last_stats >= stats_interval:
+                    self.print_lane_stats()
+                    last_stats = time.monotonic()
+                time.sleep(0.1)
+        except KeyboardInterrupt:
+            print("Stopping multi-lane sorting system...")
+        finally:
+            self.stop_sorting()
+
+    def stop_sorting(self):
+        """
+        Stop every lane, release the shared detector and reset the GPIO pins of all lanes.
+        """
+        self.running = False
+        for lane in self.lanes:
+            lane.stop()
+        hardware_running = bool(self.startup.instances)
+        self.startup.stop()
+        if self.preview:
+            self.preview.stop()
+        # Lane components only release their own pins, so a restarted lane never disturbs the others
+        if hardware_running:
+            GPIO.cleanup()
+
+
+# Notes:
+# Component Layout:
+
+# The shared detector is one startup component; every lane registers "<lane>.conveyor",
+# "<lane>.camera" and "<lane>.sorter", so all lanes come up concurrently and a single lane's
+# camera can be restarted with startup.restart("lane2.camera"). The lane's resume hooks start capture
+# (and the belt, for "<lane>.conveyor") again on the new instances; restarting "detector" restarts
+# every lane's camera the same way.
+# Shared Hardware:
+
+# Each lane's sorter releases only its own servo pin and conveyors only stop, so restarting one lane
+# leaves the other lanes' pins alone; the global GPIO.cleanup() runs once in stop_sorting. All camera
+# previews go through one PreviewDisplay thread because OpenCV's HighGUI is not thread-safe, and 'q'
+# in any window stops every lane.
+# Timing Isolation:
+
+# Each lane has its own dispatch thread and Sorter, and passes the capture timestamp on so the
+# actuation delay accounts for time spent waiting for the shared detector.
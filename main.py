@@ -1,65 +1,236 @@
+import os
+import sys
 import threading
-from queue import Queue
-from conveyor import ConveyorBelt
-from capture import CameraCapture
-from hailo_detector import HailoObjectDetector
-from sorter import Sorter
 import time
 
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+for subdir in ("capture", "detection", "movement", "events"):
+    sys.path.insert(0, os.path.join(ROOT_DIR, subdir))
+
+from startup import StartupOrchestrator, lazy_import
+from pipeline import Pipeline
+from rate_policy import AdaptiveRatePolicy
+
+GPIO = lazy_import("RPi.GPIO")
+
 
 class SortingSystem:
-    def __init__(self):
+    def __init__(self, hef_path="model.hef", routing_path=None, hef_paths_by_size=None, fov_length=0.15,
+                 observations_per_part=3, show_preview=True,
+                 event_log_dir=os.path.join(ROOT_DIR, "logs", "events"), pixel_format="YUYV", max_failed_reads=30):
         """
-        Initialize the sorting system with all components.
+        Initialize the sorting system. Hardware is only touched in `initialize_system`.
+
+        :param hef_path: Path to the compiled Hailo model (640x640 input).
+        :param routing_path: Optional JSON routing table for multi-gate sorting (see routing.json);
+                             the single bolt/nut flapper is used when omitted.
+        :param hef_paths_by_size: Optional smaller pre-compiled models, e.g. {320: 'model_320.hef', 480: 'model_480.hef'},
+                                  that the rate policy may switch to under load.
+        :param fov_length: Length of belt visible to the camera in meters.
+        :param observations_per_part: Inferences each part should get while in view.
+        :param show_preview: Show the camera feed in a window (press 'q' to stop). With a native pixel_format
+                             this converts every frame to full-resolution BGR; turn it off on a headless
+                             belt to keep the single-pass conversion savings.
+        :param event_log_dir: Directory for the binary sort event log (query it with events/query.py);
+                              None disables logging.
+        :param pixel_format: Native camera format ('YUYV', 'NV12', 'MJPEG') converted straight to model input,
+                             or 'BGR' for OpenCV's own conversion (see capture/bench_capture.py).
+        :param max_failed_reads: Consecutive failed camera reads before the camera is restarted.
         """
-        # Conveyor setup
-        self.conveyor = ConveyorBelt(step_pin=17, dir_pin=27, max_speed=1.0)
-
-        # Object detection setup
-        self.detector = HailoObjectDetector()  # Configure the detector as per its implementation
+        self.hef_path = hef_path
+        self.routing_path = routing_path
+        self.event_log_dir = event_log_dir
+        self.pixel_format = pixel_format
+        self.hef_paths_by_size = hef_paths_by_size or {}
+        self.rate_policy = AdaptiveRatePolicy(
+            fov_length=fov_length,
+            observations_per_part=observations_per_part,
+            max_fps=30,
+            input_sizes=sorted(set(self.hef_paths_by_size) | {640}),
+        )
+        self.fov_length = fov_length
+        self.startup = StartupOrchestrator()
+
+        # Each factory imports its own module so hardware libraries load on the worker thread
+        self.startup.register("conveyor", self._start_conveyor, cleanup=lambda conveyor: conveyor.stop(),
+                              resume=self._resume_conveyor)
+        self.startup.register("detector", self._start_detector, cleanup=lambda detector: detector.cleanup())
+        self.startup.register("camera", self._start_camera, cleanup=lambda camera: camera.cleanup())
+        self.startup.register("event_log", self._start_event_log,
+                              cleanup=lambda event_log: event_log.close() if event_log else None)
+        self.startup.register("sorter", self._start_sorter, depends_on=("conveyor", "event_log"),
+                              cleanup=lambda sorter: sorter.cleanup())
 
-        # Camera setup
-        self.camera = CameraCapture(
+        self.running = False
+        self.show_preview = show_preview
+        self.pipeline = None
+        self.max_failed_reads = max_failed_reads
+        self.failed_reads = 0
+
+    @property
+    def conveyor(self):
+        return self.startup.instances.get("conveyor")
+
+    @property
+    def detector(self):
+        return self.startup.instances.get("detector")
+
+    @property
+    def camera(self):
+        return self.startup.instances.get("camera")
+
+    @property
+    def sorter(self):
+        return self.startup.instances.get("sorter")
+
+    def _start_conveyor(self, deps):
+        from conveyor import ConveyorBelt
+
+        conveyor = ConveyorBelt(step_pin=17, dir_pin=27, max_speed=1.0)
+        conveyor.set_speed(0.1)  # Set initial conveyor speed
+        return conveyor
+
+    def _resume_conveyor(self, conveyor, previous):
+        # The factory leaves a new belt stopped; bring it back at the speed the old one was running
+        if self.running:
+            conveyor.start(speed=previous.speed)
+        else:
+            conveyor.set_speed(previous.speed)
+
+    def _start_detector(self, deps):
+        from detector import HailoObjectDetector
+
+        if self.routing_path:
+            # The routing table addresses model classes directly, so do not collapse them to bolt/nut
+            detector = HailoObjectDetector(self.hef_path, class_mapping=None, hef_paths_by_size=self.hef_paths_by_size)
+        else:
+            detector = HailoObjectDetector(self.hef_path, hef_paths_by_size=self.hef_paths_by_size)
+        return detector
+
+    def _start_camera(self, deps):
+        from capture import CameraCapture
+
+        camera = CameraCapture(
             width=1280,
             height=720,
             fps=30,
-            detection_callback=self.detect_and_sort
+            pixel_format=self.pixel_format,
         )
+        camera.initialize_camera()
+        return camera
 
-        # Sorter setup
-        self.sorter = Sorter(servo_pin=18, bolt_angle=90, nut_angle=0, default_angle=45)
+    def _start_event_log(self, deps):
+        if not self.event_log_dir:
+            return None
+        from eventlog import EventLogWriter
 
-        self.running = False
-        self.detected_objects_queue = Queue()  # Queue to store detected objects for sorting
+        return EventLogWriter(self.event_log_dir)
+
+    def _start_sorter(self, deps):
+        if self.routing_path:
+            from routing import GateRouter, RoutingTable
+
+            return GateRouter(RoutingTable.load(self.routing_path), conveyor=deps["conveyor"],
+                              event_log=deps["event_log"], fov_length=self.fov_length)
+
+        from sorter import Sorter
+
+        # Homing the servo waits for it to settle, which now overlaps camera and model start-up
+        return Sorter(servo_pin=18, bolt_angle=90, nut_angle=0, default_angle=45, conveyor=deps["conveyor"],
+                      event_log=deps["event_log"], fov_length=self.fov_length)
 
     def initialize_system(self):
         """
-        Initialize all components.
+        Initialize all components concurrently and print the startup timing breakdown.
         """
         print("Initializing sorting system...")
-        self.conveyor.set_speed(0.1)  # Set initial conveyor speed
-        self.camera.initialize_camera()
+        self.startup.start()
+        print(self.startup.report())
+
+    def recover(self, *components):
+        """
+        Restart faulted components without tearing down the healthy ones.
+
+        The capture stage calls this when the camera stops delivering frames; the pipeline looks the
+        components up on every frame, so it carries on with the new instances.
+
+        :param components: Component names to restart (e.g. 'camera'); all when omitted.
+        """
+        self.startup.restart(*components)
+        print(self.startup.report())
+
+    def capture_stage(self):
+        """
+        Pipeline source: read a frame, show the preview and pass on only the frames the rate policy needs.
+
+        :return: Frame packet dict, or None to skip this frame.
+        """
+        packet = self.camera.read_frame() if self.camera else None
+        if packet is None:
+            self.failed_reads += 1
+            if self.failed_reads >= self.max_failed_reads:
+                print(f"No frame in {self.failed_reads} reads. Restarting the camera...")
+                self.failed_reads = 0
+                self.recover("camera")
+            return None
+        self.failed_reads = 0
+        # Full-resolution BGR is only built for the preview window
+        if self.show_preview and self.camera.show_preview(self.camera.frame_bgr(packet)):
+            self.running = False
+        # Only run as many inferences as the belt speed needs
+        if not self.rate_policy.should_infer(packet["timestamp"]):
+            return None
+        return packet
+
+    def detect_stage(self, packet):
+        """
+        Pipeline stage: run the detector on one frame, at the input size the load allows.
 
-    def detect_and_sort(self, frame):
+        :param packet: Frame packet from the capture stage.
+        :return: The packet with "detections" added, or None if nothing was detected.
+        """
+        settings = self.rate_policy.update(self.conveyor.speed, self.detector.inference_latency)
+        if settings["input_size"] != self.detector.input_size:
+            print(f"Switching detector input to {settings['input_size']}x{settings['input_size']}.")
+            self.detector.set_input_size(settings["input_size"])
+
+        image = self.camera.model_input(packet, self.detector.input_size)
+        packet["detections"] = self.detector.detect_prepared([image], [packet["shape"]])[0]
+        # Downstream stages do not need the pixels
+        packet.pop("raw")
+        packet.pop("frame", None)
+        return packet if packet["detections"] else None
+
+    def dispatch_stage(self, packet):
         """
-        Callback for detecting objects and sorting based on detections.
+        Pipeline sink: hand detected objects to the sorter.
 
-        :param frame: Frame captured by the camera.
+        :param packet: Packet with detections from the detect stage.
         """
-        detected_objects = self.detector.detect(frame)
-        if detected_objects:
-            print(f"Detected objects: {detected_objects}")
-            for obj in detected_objects:
-                self.detected_objects_queue.put(obj)  # Add each detected object to the queue
+        detected_classes = [detection["class"] for detection in packet["detections"]]
+        print(f"Detected objects: {detected_classes}")
+        self.sorter.handle_detection(detected_classes, captured_at=packet["timestamp"],
+                                     detections=packet["detections"], frame_id=packet["frame_id"],
+                                     frame_shape=packet["shape"])
 
-    def sort_objects(self):
+    def build_pipeline(self):
         """
-        Sort objects based on their type and detected objects.
+        Wire capture -> detect -> dispatch with bounded edges.
+
+        :return: Pipeline instance (not started).
         """
-        while not self.detected_objects_queue.empty():
-            detected_object = self.detected_objects_queue.get()  # Retrieve an object from the queue
-            print(f"Sorting object: {detected_object}")
-            self.sorter.handle_detection([detected_object])
+        pipeline = Pipeline()
+        pipeline.add_stage("capture", self.capture_stage, source=True)
+        pipeline.add_stage("detect", self.detect_stage, workers=1)  # One accelerator
+        pipeline.add_stage("dispatch", self.dispatch_stage, workers=1)
+        # A busy detector only ever sees the newest frame; capture never waits on it
+        pipeline.connect("capture", "detect", policy="coalesce_latest")
+        # Every detection is a part that must be sorted, and dispatch only schedules timers
+        pipeline.connect("detect", "dispatch", maxsize=32, policy="block")
+        # Dispatch only schedules actuations; report the bounded actuation queues it feeds
+        for name in self.sorter.schedulers:
+            pipeline.add_monitor(name, lambda name=name: self.sorter.schedulers[name].stats())
+        return pipeline
 
     def conveyor_thread_func(self):
         """
@@ -71,19 +242,11 @@ class SortingSystem:
             print(f"Error in conveyor thread: {e}")
             self.stop_sorting()
 
-    def camera_thread_func(self):
-        """
-        Capture frames and detect objects in a separate thread.
-        """
-        try:
-            self.camera.capture_and_detect()
-        except Exception as e:
-            print(f"Error in camera thread: {e}")
-            self.stop_sorting()
-
-    def start_sorting(self):
+    def start_sorting(self, metrics_interval=10):
         """
         Start the sorting process.
+
+        :param metrics_interval: Seconds between pipeline and inference rate metrics printouts.
         """
         self.running = True
         print("Starting sorting system...")
@@ -93,16 +256,19 @@ class SortingSystem:
         conveyor_thread.daemon = True  # Make it a daemon thread so it stops when the main program stops
         conveyor_thread.start()
 
-        # Start the camera capture and detection in a separate thread
-        camera_thread = threading.Thread(target=self.camera_thread_func)
-        camera_thread.daemon = True  # Make it a daemon thread
-        camera_thread.start()
+        # Capture, detection and dispatch run as pipeline stages on their own threads
+        self.pipeline = self.build_pipeline()
+        self.pipeline.start()
 
-        # Main thread continuously processes detected objects for sorting
+        # Main thread reports metrics until stopped
+        last_metrics = time.monotonic()
         try:
             while self.running:
-                self.sort_objects()  # Check and sort objects in the queue
-                time.sleep(1)  # Small delay to prevent high CPU usage
+                if time.monotonic() - last_metrics >= metrics_interval:
+                    print(self.pipeline.format_stats())
+                    print(self.rate_policy.format_metrics())
+                    last_metrics = time.monotonic()
+                time.sleep(0.1)
         except KeyboardInterrupt:
             print("Stopping sorting system...")
         finally:
@@ -113,9 +279,14 @@ class SortingSystem:
         Stop the sorting process.
         """
         self.running = False
-        self.conveyor.stop()
-        self.camera.cleanup()
-        self.sorter.cleanup()
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
+        hardware_running = bool(self.startup.instances)
+        self.startup.stop()
+        # Components release only their own pins; reset the rest of the header once
+        if hardware_running:
+            GPIO.cleanup()
 
 
 if __name__ == "__main__":
@@ -124,12 +295,15 @@ if __name__ == "__main__":
     print("\nOptions:")
     print("1. Run locally on Raspberry Pi")
     print("2. Prepare for headless operation (future feature)")
+    print("3. Run two lanes sharing one detector")
+    print("4. Run locally with multi-gate routing (routing.json)")
 
-    user_choice = input("Enter your choice (1/2): ").strip()
+    user_choice = input("Enter your choice (1/2/3/4): ").strip()
 
-    if user_choice == "1":
+    if user_choice in ("1", "4"):
         # Local operation on Raspberry Pi
-        system = SortingSystem()
+        routing_path = os.path.join(ROOT_DIR, "routing.json") if user_choice == "4" else None
+        system = SortingSystem(routing_path=routing_path)
         try:
             system.initialize_system()
             system.start_sorting()
@@ -142,6 +316,20 @@ if __name__ == "__main__":
         print("Headless operation feature will be implemented in the future.")
         # Here, you can add network communication, e.g., WebSocket or HTTP server
         # to control the system remotely from your laptop.
+    elif user_choice == "3":
+        from lanes import Lane, MultiLaneSortingSystem
+
+        system = MultiLaneSortingSystem([
+            Lane("lane1", camera_id=0, step_pin=17, dir_pin=27, servo_pin=18),
+            Lane("lane2", camera_id=1, step_pin=22, dir_pin=23, servo_pin=13),
+        ])
+        try:
+            system.initialize_system()
+            system.start_sorting()
+        except Exception as e:
+            print(f"Error: {e}")
+        finally:
+            system.stop_sorting()
     else:
         print("Invalid choice. Exiting...")
 
@@ -199,4 +387,12 @@ if __name__ == "__main__":
 # Benefits:
 # Concurrent Operations: The conveyor and camera operations are now handled in parallel, improving system responsiveness.
 # Thread-Safe Object Sorting: The queue ensures that detected objects are processed in order, without race conditions.
-# Improved Error Handling: The system is more robust with error handling in the threads.
\ No newline at end of file
+# Improved Error Handling: The system is more robust with error handling in the threads.
+
+
+# Pipeline Runtime:
+# Capture, detection and dispatch are stages of pipeline.Pipeline linked by bounded edges, replacing the
+# camera callback, detected_objects_queue and polling loop described above. capture->detect coalesces to
+# the newest frame so a slow detector never stalls capture; detect->dispatch blocks on a 32-entry edge
+# because every detection is a part that must be sorted. Queue depths, drops and per-stage latency are
+# printed every metrics_interval seconds.
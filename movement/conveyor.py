@@ -1,7 +1,31 @@
-import RPi.GPIO as GPIO
+import os
+import sys
 import time
 import threading
 
+if __name__ == "__main__":  # Run on its own: startup.py lives in the repo root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from startup import lazy_import
+
+GPIO = lazy_import("RPi.GPIO")
+
+
+def distance_past_center(bbox, frame_shape, fov_length):
+    """
+    How far a detected part has already travelled past the middle of the camera's view.
+
+    The belt is assumed to run along the image x axis, left to right, towards the gates.
+
+    :param bbox: Pixel bounding box (x_min, y_min, x_max, y_max).
+    :param frame_shape: (height, width) of the frame the box was detected in.
+    :param fov_length: Length of belt visible to the camera in meters.
+    :return: Distance in meters; negative while the part is in the left half of the frame.
+    """
+    x_min, _, x_max, _ = bbox
+    return ((x_min + x_max) / 2 / frame_shape[1] - 0.5) * fov_length
+
+
 class ConveyorBelt:
     def __init__(self, step_pin=17, dir_pin=27, max_speed=1.0):
         """
@@ -45,14 +69,21 @@ class ConveyorBelt:
         else:
             print("Speed adjustment out of range.")
 
-    def start(self):
-        """Start the conveyor belt by sending step pulses."""
+    def start(self, speed=None):
+        """
+        Start the conveyor belt by sending step pulses.
+
+        :param speed: Speed in m/s; the operator is prompted when omitted.
+        """
         if not self.running:
-            try:
-                new_speed = float(input("Enter speed in m/s: "))
-                self.set_speed(new_speed)
-            except ValueError:
-                print("Invalid input. Using previous speed.")
+            if speed is not None:
+                self.set_speed(speed)
+            else:
+                try:
+                    new_speed = float(input("Enter speed in m/s: "))
+                    self.set_speed(new_speed)
+                except ValueError:
+                    print("Invalid input. Using previous speed.")
             print("Starting conveyor belt...")
             self.running = True
             threading.Thread(target=self.send_steps, daemon=True).start()
@@ -0,0 +1,289 @@
+import json
+import threading
+import time
+from conveyor import distance_past_center
+from scheduler import ActuationScheduler
+from servo import ServoDriver
+from tracking import PartTracker
+from eventlog import NO_GATE, STATUS_MISSED, STATUS_PASSED, STATUS_SORTED
+from startup import lazy_import
+
+GPIO = lazy_import("RPi.GPIO")
+
+
+class Gate:
+    def __init__(self, name, servo_pin, distance, open_angle=90, closed_angle=0, hold_time=0.5,
+                 servo_profile="MG996R", max_pending=64):
+        """
+        One diverter gate along the belt with its own servo and actuation scheduler.
+
+        :param name: Gate (bin) name used in the routing table.
+        :param servo_pin: GPIO pin connected to this gate's servo.
+        :param distance: Distance from the camera to this gate in meters.
+        :param open_angle: Servo angle that diverts a part into this gate's bin.
+        :param closed_angle: Servo angle that lets parts pass.
+        :param hold_time: Time (in seconds) the gate stays open per part.
+        :param servo_profile: Speed profile name in servo.SERVO_PROFILES (or a profile dict).
+        :param max_pending: Scheduled commands above which new parts are refused (and counted as dropped).
+        """
+        self.name = name
+        self.servo_pin = servo_pin
+        self.distance = distance
+        self.open_angle = open_angle
+        self.closed_angle = closed_angle
+        self.hold_time = hold_time
+        self.intervals = []  # Scheduled openings: {"open_at", "close_at", "opened", "active"}
+        self.lock = threading.Lock()
+        self.scheduler = ActuationScheduler(name=f"gate-{name}", capacity=max_pending)
+
+        # Set up the servo; its pulse release runs on this gate's scheduler
+        self.servo = ServoDriver(self.servo_pin, profile=servo_profile, scheduler=self.scheduler)
+        self.move_to_angle(self.closed_angle)  # Homing; callers wait with servo.wait_until_ready()
+
+    def move_to_angle(self, angle):
+        """
+        Start moving this gate's servo to a specific angle (between 0 and 180 degrees).
+
+        :param angle: Target angle for the servo.
+        :return: time.monotonic() at which the servo will have settled.
+        """
+        print(f"Moving gate {self.name} to {angle} degrees.")
+        return self.servo.move(angle)
+
+    def _open(self, interval, open_at):
+        with self.lock:
+            if not interval["active"] or interval["opened"] or interval["open_at"] != open_at:
+                return  # Merged into another opening, already open, or moved earlier
+            interval["opened"] = True
+        self.move_to_angle(self.open_angle)
+
+    def _close(self, interval, close_at):
+        with self.lock:
+            if not interval["active"] or interval["close_at"] != close_at:
+                return  # Merged into another opening, or extended by a later part
+            interval["active"] = False
+            self.intervals = [other for other in self.intervals if other is not interval]
+        self.move_to_angle(self.closed_angle)
+
+    def divert(self, arrival_time, on_arrival=None):
+        """
+        Have the gate open when a part arrives and close it `hold_time` later.
+
+        A part whose opening (arrival minus the servo lead time) starts before the current hold ends
+        extends that opening; otherwise the gate closes in between so parts bound for later gates pass.
+
+        :param arrival_time: time.monotonic() at which the part reaches this gate.
+        :param on_arrival: Optional callback run at `arrival_time` with the time the gate was (or will be)
+                           open, or None if it is not heading to the open position.
+        :return: False if the gate's actuation queue is full and the part was not scheduled.
+        """
+        if not self.scheduler.admit():
+            return False
+        lead_time = self.servo.predict_move_time(self.open_angle, self.closed_angle)
+        open_at = arrival_time - lead_time
+        close_at = arrival_time + self.hold_time
+        with self.lock:
+            overlapping = [interval for interval in self.intervals
+                           if open_at <= interval["close_at"] and interval["open_at"] <= close_at]
+            if overlapping:
+                interval = overlapping[0]
+                for other in overlapping[1:]:  # The new part bridges several openings
+                    other["active"] = False
+                    interval["opened"] = interval["opened"] or other["opened"]
+                    open_at = min(open_at, other["open_at"])
+                    close_at = max(close_at, other["close_at"])
+                self.intervals = [other for other in self.intervals if other["active"]]
+            else:
+                interval = {"open_at": open_at, "close_at": close_at, "opened": False, "active": True}
+                self.intervals.append(interval)
+                self.scheduler.schedule_at(open_at, self._open, interval, open_at)
+                self.scheduler.schedule_at(close_at, self._close, interval, close_at)
+
+            if open_at < interval["open_at"] and not interval["opened"]:
+                interval["open_at"] = open_at
+                self.scheduler.schedule_at(open_at, self._open, interval, open_at)
+            if close_at > interval["close_at"]:
+                interval["close_at"] = close_at
+                self.scheduler.schedule_at(close_at, self._close, interval, close_at)
+            if on_arrival:
+                self.scheduler.schedule_at(arrival_time, self._check_arrival, on_arrival)
+        return True
+
+    def _check_arrival(self, on_arrival):
+        with self.servo.lock:
+            opening = self.servo.target_angle == self.open_angle
+            ready_at = self.servo.ready_at
+        on_arrival(ready_at if opening else None)
+
+    def cleanup(self):
+        """
+        Stop the scheduler, close the gate, stop the servo and release its GPIO pin.
+        """
+        self.scheduler.stop()
+        self.move_to_angle(self.closed_angle)
+        self.servo.wait_until_ready()
+        self.servo.stop()
+        GPIO.cleanup(self.servo_pin)
+
+
+class RoutingTable:
+    def __init__(self, gates, routes, default_gate=None):
+        """
+        Data-driven mapping of detector classes to gates.
+
+        :param gates: List of gate settings dicts (keyword arguments of Gate).
+        :param routes: Dict of detector class name to gate name.
+        :param default_gate: Gate for classes without a route (default: let them pass to the end of the belt).
+        """
+        self.gates = gates
+        self.routes = routes
+        self.default_gate = default_gate
+
+        gate_names = {gate["name"] for gate in gates}
+        for class_name, gate_name in list(routes.items()) + [("default", default_gate)]:
+            if gate_name is not None and gate_name not in gate_names:
+                raise ValueError(f"Route '{class_name}' points to unknown gate '{gate_name}'.")
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a routing table from a JSON file with "gates", "routes" and optional "default_gate" keys.
+
+        :param path: Path to the JSON file.
+        :return: RoutingTable instance.
+        """
+        with open(path) as f:
+            config = json.load(f)
+        return cls(config["gates"], config["routes"], config.get("default_gate"))
+
+    def gate_for(self, class_name):
+        """
+        Return the gate name for a detector class, or None if the part should pass through.
+
+        :param class_name: Detector class name.
+        """
+        return self.routes.get(class_name, self.default_gate)
+
+
+class GateRouter:
+    def __init__(self, routing_table, conveyor=None, event_log=None, fov_length=None):
+        """
+        Route detected parts to N gates placed along one belt.
+
+        :param routing_table: RoutingTable instance.
+        :param conveyor: ConveyorBelt instance for speed tracking.
+        :param event_log: Optional EventLogWriter recording every detection and actuation.
+        :param fov_length: Length of belt visible to the camera in meters. Gate distances are then
+                           measured from the middle of the view and each part's arrival is corrected
+                           by where it was in the frame; without it every part is timed from the middle.
+        """
+        self.routing_table = routing_table
+        self.conveyor = conveyor
+        self.event_log = event_log
+        self.fov_length = fov_length
+        self.tracker = PartTracker(event_log.new_part_id) if event_log else None
+        self.gates = {settings["name"]: Gate(**settings) for settings in routing_table.gates}
+        self.gate_indices = {name: index for index, name in enumerate(self.gates)}  # Gate numbers in the event log
+        for gate in self.gates.values():  # All gates home at the same time
+            gate.servo.wait_until_ready()
+
+    def calculate_travel_time(self, gate, travelled=0.0):
+        """
+        Calculate the travel time from the camera to a gate based on conveyor speed.
+
+        :param gate: Gate instance.
+        :param travelled: Meters the part had already moved past the middle of the view when captured.
+        :return: Travel time in seconds.
+        """
+        if self.conveyor and self.conveyor.speed > 0:
+            return max(0.0, gate.distance - travelled) / self.conveyor.speed
+        else:
+            raise ValueError("Conveyor speed must be greater than 0.")
+
+    def _log_event(self, frame_id, captured_at, detection, due_at, gate_index, actual_time, status, part_id=0):
+        detection = detection or {}
+        self.event_log.log(frame_id, captured_at, due_at, actual_time, detection.get("class_id", 0),
+                           detection.get("confidence", 0.0), detection.get("bbox", (0, 0, 0, 0)),
+                           gate=gate_index, status=status, part_id=part_id)
+
+    def handle_detection(self, detected_classes, captured_at=None, detections=None, frame_id=0, frame_shape=None):
+        """
+        Schedule the gate for each detected part. Same interface as Sorter.handle_detection.
+
+        :param detected_classes: List of detected classes (e.g., ['bolt', 'nut', 'washer']).
+        :param captured_at: time.monotonic() when the frame was captured (default: now).
+        :param detections: Detector output dicts matching `detected_classes`, for the event log and,
+                           with `frame_shape`, for the part's position on the belt.
+        :param frame_id: Frame the detections came from, for the event log.
+        :param frame_shape: (height, width) of the frame the bounding boxes are in.
+        """
+        captured_at = time.monotonic() if captured_at is None else captured_at
+
+        for index, detected_class in enumerate(detected_classes):
+            detection = detections[index] if detections else None
+            # Successive frames see the same part further along; all of them must predict the same arrival
+            travelled = 0.0
+            if self.fov_length and frame_shape and detection and "bbox" in detection:
+                travelled = distance_past_center(detection["bbox"], frame_shape, self.fov_length)
+            part_id = 0
+            if self.tracker and self.conveyor and self.conveyor.speed > 0:
+                # Every observation agrees on when the part crossed the middle of the view
+                part_id = self.tracker.part_id(detected_class, captured_at - travelled / self.conveyor.speed)
+
+            gate_name = self.routing_table.gate_for(detected_class)
+            if gate_name is None:
+                print(f"Detected: {detected_class}. No route, passing through.")
+                if self.event_log:
+                    self._log_event(frame_id, captured_at, detection, captured_at, NO_GATE, None, STATUS_PASSED,
+                                    part_id)
+                continue
+            gate = self.gates[gate_name]
+            arrival_time = captured_at + self.calculate_travel_time(gate, travelled)
+            print(f"Detected: {detected_class}. Gate {gate_name} in {arrival_time - time.monotonic():.2f} seconds.")
+
+            on_arrival = None
+            if self.event_log:
+                def on_arrival(actual_time, detection=detection, arrival_time=arrival_time,
+                               gate_index=self.gate_indices[gate_name], part_id=part_id):
+                    # Lateness (actual vs. arrival time) is judged by the query, with a tolerance
+                    self._log_event(frame_id, captured_at, detection, arrival_time, gate_index, actual_time,
+                                    STATUS_MISSED if actual_time is None else STATUS_SORTED, part_id)
+            if not gate.divert(arrival_time, on_arrival):
+                print(f"Gate {gate_name} actuation queue full, dropping {detected_class}.")
+                if self.event_log:
+                    self._log_event(frame_id, captured_at, detection, arrival_time,
+                                    self.gate_indices[gate_name], None, STATUS_MISSED, part_id)
+
+    @property
+    def schedulers(self):
+        """Actuation schedulers by name, for queue depth and drop reporting."""
+        return {gate.scheduler.name: gate.scheduler for gate in self.gates.values()}
+
+    def cleanup(self):
+        """
+        Close every gate and release the gates' GPIO pins.
+        """
+        for gate in self.gates.values():
+            gate.cleanup()
+
+
+# Notes:
+# Routing Table:
+
+# Gates and routes live in a JSON file (see routing.json), so adding a bin means adding a gate
+# entry and pointing classes at it; no code changes are needed.
+# Parallel Gates:
+
+# Every gate has its own servo and ActuationScheduler thread, so consecutive parts bound for
+# different bins are handled concurrently instead of queueing behind one flapper's move and hold.
+# Back-to-Back Parts:
+
+# Each gate tracks its scheduled open intervals [arrival - lead time, arrival + hold_time]. A part whose
+# interval overlaps an existing one extends it instead of closing and re-opening the gate; a part due
+# after the current hold ends gets its own interval, so the gate closes in between and parts bound for
+# downstream gates are not diverted into this bin.
+# Several Observations per Part:
+
+# The rate policy infers each part a few times while it crosses the view. With fov_length set, the
+# arrival time is computed from where the box is in the frame, so those observations agree on one
+# arrival and re-extend the same short opening instead of stretching it by the time spent in view.
@@ -0,0 +1,110 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class ActuationScheduler:
+    def __init__(self, name="actuation", capacity=None):
+        """
+        Run actuator commands at absolute monotonic times on one dedicated thread.
+
+        Unlike one threading.Timer per command, commands for the same actuator run strictly in
+        time order and never overlap, while separate schedulers run independently.
+
+        :param name: Name of the scheduler thread (useful in debugging output).
+        :param capacity: Pending commands above which `admit` refuses new work (default: unbounded).
+        """
+        self.name = name
+        self.capacity = capacity
+        self.queue = []  # Heap of (due_time, sequence, function, args)
+        self.admitted = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.stop_thread = False
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def schedule_at(self, due_time, function, *args):
+        """
+        Run `function(*args)` at `due_time` (time.monotonic() clock).
+
+        :param due_time: Absolute time to run the command.
+        :param function: Callable to run.
+        """
+        with self.condition:
+            heapq.heappush(self.queue, (due_time, next(self.sequence), function, args))
+            self.max_depth = max(self.max_depth, len(self.queue))
+            self.condition.notify()
+
+    def admit(self):
+        """
+        Check whether a new unit of work (e.g. one part to sort) may be scheduled.
+
+        Follow-up commands of admitted work (returning a flapper, releasing a pulse) are always
+        queued with schedule_at, so only new work is refused and the queue stays bounded.
+
+        :return: True if there is room; False (counted as dropped) once `capacity` commands are pending.
+        """
+        with self.condition:
+            if self.capacity is not None and len(self.queue) >= self.capacity:
+                self.dropped += 1
+                return False
+            self.admitted += 1
+            return True
+
+    def schedule_in(self, delay, function, *args):
+        """
+        Run `function(*args)` after `delay` seconds.
+
+        :param delay: Delay in seconds.
+        :param function: Callable to run.
+        """
+        self.schedule_at(time.monotonic() + delay, function, *args)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.stop_thread:
+                    if self.queue:
+                        wait = self.queue[0][0] - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self.condition.wait(timeout=wait)
+                    else:
+                        self.condition.wait()
+                if self.stop_thread:
+                    return
+                _, _, function, args = heapq.heappop(self.queue)
+
+            try:
+                function(*args)
+            except Exception as e:
+                print(f"Error in {self.name} scheduler: {e}")
+
+    def pending(self):
+        """Number of commands waiting to run."""
+        with self.condition:
+            return len(self.queue)
+
+    def stats(self):
+        """Queue depth and admission accounting, in the same terms as pipeline edge stats."""
+        with self.condition:
+            return {
+                "depth": len(self.queue),
+                "max_depth": self.max_depth,
+                "capacity": self.capacity,
+                "admitted": self.admitted,
+                "dropped": self.dropped,
+            }
+
+    def stop(self):
+        """Discard pending commands and stop the scheduler thread."""
+        with self.condition:
+            self.stop_thread = True
+            self.queue.clear()
+            self.condition.notify()
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join()
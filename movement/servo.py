@@ -0,0 +1,145 @@
+import threading
+import time
+from startup import lazy_import
+
+GPIO = lazy_import("RPi.GPIO")
+
+# Calibrated speed profiles: no-load seconds per 60 degrees and the extra time the horn needs to
+# stop ringing once it reaches the target. Measure your own servo and add it here.
+SERVO_PROFILES = {
+    "MG996R": {"seconds_per_60deg": 0.17, "settle_time": 0.06},
+    "SG90": {"seconds_per_60deg": 0.10, "settle_time": 0.04},
+}
+
+
+class ServoDriver:
+    def __init__(self, servo_pin, profile="MG996R", frequency=50, release_when_settled=True, scheduler=None):
+        """
+        Non-blocking hobby servo driver with settle-time prediction.
+
+        :param servo_pin: GPIO pin connected to the servo signal line.
+        :param profile: Name in SERVO_PROFILES or a dict with "seconds_per_60deg" and "settle_time".
+        :param frequency: PWM frequency in Hz.
+        :param release_when_settled: Drop the pulse once the servo has settled to stop holding jitter.
+        :param scheduler: Optional ActuationScheduler used to release the pulse (default: threading.Timer).
+        """
+        self.servo_pin = servo_pin
+        self.profile = SERVO_PROFILES[profile] if isinstance(profile, str) else profile
+        self.degrees_per_second = 60 / self.profile["seconds_per_60deg"]
+        self.settle_time = self.profile["settle_time"]
+        self.release_when_settled = release_when_settled
+        self.scheduler = scheduler
+
+        self.lock = threading.Lock()
+        self.start_angle = None  # Unknown until the first move
+        self.target_angle = None
+        self.move_started_at = 0.0
+        self.ready_at = 0.0  # time.monotonic() at which the current move has settled
+        self.move_id = 0
+
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(self.servo_pin, GPIO.OUT)
+        self.pwm = GPIO.PWM(self.servo_pin, frequency)
+        self.pwm.start(0)  # Initialize with 0% duty cycle
+
+    def estimated_angle(self, now=None):
+        """
+        Estimate the current horn angle by interpolating the move in progress.
+
+        :param now: time.monotonic() (default: now).
+        :return: Estimated angle, or None if the servo has never been moved.
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            return self._estimated_angle(now)
+
+    def _estimated_angle(self, now):
+        if self.target_angle is None or self.start_angle is None:
+            return self.target_angle
+        travel = abs(self.target_angle - self.start_angle)
+        if travel == 0:
+            return self.target_angle
+        progress = min(1.0, (now - self.move_started_at) * self.degrees_per_second / travel)
+        return self.start_angle + (self.target_angle - self.start_angle) * progress
+
+    def predict_move_time(self, angle, from_angle=None):
+        """
+        Predict how long a move takes to settle.
+
+        :param angle: Target angle.
+        :param from_angle: Starting angle (default: the estimated current angle; full range if unknown).
+        :return: Seconds from issuing the move until the servo has settled.
+        """
+        if from_angle is None:
+            from_angle = self.estimated_angle()
+        distance = 180 if from_angle is None else abs(angle - from_angle)
+        return distance / self.degrees_per_second + self.settle_time
+
+    def move(self, angle):
+        """
+        Start moving to `angle` (0-180 degrees) and return immediately.
+
+        :param angle: Target angle for the servo.
+        :return: time.monotonic() at which the servo will have settled.
+        """
+        now = time.monotonic()
+        with self.lock:
+            current = self._estimated_angle(now)
+            distance = 180 if current is None else abs(angle - current)
+            self.start_angle = current
+            self.target_angle = angle
+            self.move_started_at = now
+            self.ready_at = now + distance / self.degrees_per_second + self.settle_time
+            self.move_id += 1
+            move_id = self.move_id
+            ready_at = self.ready_at
+
+        duty_cycle = (angle / 18) + 2  # Convert angle to duty cycle
+        self.pwm.ChangeDutyCycle(duty_cycle)
+
+        if self.release_when_settled:
+            if self.scheduler:
+                self.scheduler.schedule_at(ready_at, self._release, move_id)
+            else:
+                timer = threading.Timer(ready_at - now, self._release, args=(move_id,))
+                timer.daemon = True
+                timer.start()
+        return ready_at
+
+    def _release(self, move_id):
+        with self.lock:
+            if move_id != self.move_id:  # A newer move owns the pulse now
+                return
+        self.pwm.ChangeDutyCycle(0)
+
+    def wait_until_ready(self):
+        """
+        Block until the current move has settled.
+        """
+        delay = self.ready_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def stop(self):
+        """
+        Stop driving the servo.
+        """
+        with self.lock:
+            self.move_id += 1
+        self.pwm.ChangeDutyCycle(0)
+        self.pwm.stop()
+
+
+# Notes:
+# Settle-Time Prediction:
+
+# A move takes |target - current| / speed + settle_time, using the calibrated SERVO_PROFILES entry,
+# so a 10-degree correction no longer costs the same fixed 0.5 s as a 90-degree swing.
+# Non-Blocking Moves:
+
+# move() only changes the duty cycle and returns the "ready at" time; callers that must wait use
+# wait_until_ready(), and actuation schedulers plan ahead with predict_move_time().
+# Pulse Release:
+
+# Once a move has settled the duty cycle is set to 0, which stops the holding jitter. A newer move
+# invalidates the pending release so it never cuts a move short.
@@ -1,12 +1,25 @@
-import RPi.GPIO as GPIO
+import os
+import sys
 import time
-from threading import Timer, Thread
-from conveyor import ConveyorBelt  # Import ConveyorBelt to access speed
+
+if __name__ == "__main__":  # Run on its own: startup.py and the event log live outside movement/
+    ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path[:0] = [ROOT_DIR, os.path.join(ROOT_DIR, "events")]
+
+from conveyor import ConveyorBelt, distance_past_center  # Import ConveyorBelt to access speed
+from scheduler import ActuationScheduler
+from servo import ServoDriver
+from tracking import PartTracker
+from eventlog import NO_GATE, STATUS_MISSED, STATUS_PASSED, STATUS_SORTED
+from startup import lazy_import
+
+GPIO = lazy_import("RPi.GPIO")
 
 
 class Sorter:
     def __init__(self, servo_pin=18, bolt_angle=0, nut_angle=90, default_angle=45, 
-                 hold_time=3, conveyor=None, distance_to_flapper=0.5):
+                 hold_time=3, conveyor=None, distance_to_flapper=0.5, servo_profile="MG996R", event_log=None,
+                 max_pending_actuations=64, fov_length=None):
         """
         Initialize sorting system with GPIO and servo control.
 
@@ -17,6 +30,11 @@ class Sorter:
         :param hold_time: Time (in seconds) to hold the servo position before returning to default.
         :param conveyor: ConveyorBelt instance for speed tracking.
         :param distance_to_flapper: Distance between the camera and sorting flapper in meters.
+        :param servo_profile: Speed profile name in servo.SERVO_PROFILES (or a profile dict).
+        :param event_log: Optional EventLogWriter recording every detection and actuation.
+        :param max_pending_actuations: Scheduled commands above which new detections are dropped (and counted).
+        :param fov_length: Length of belt visible to the camera in meters; when set, distance_to_flapper is
+                           measured from the middle of the view and corrected by each part's position in the frame.
         """
         self.servo_pin = servo_pin
         self.bolt_angle = bolt_angle
@@ -25,77 +43,151 @@ class Sorter:
         self.hold_time = hold_time
         self.conveyor = conveyor
         self.distance_to_flapper = distance_to_flapper
+        self.event_log = event_log
+        self.fov_length = fov_length
+        self.tracker = PartTracker(event_log.new_part_id) if event_log else None
+
+        # All flapper commands run in time order on one bounded scheduler thread
+        self.scheduler = ActuationScheduler(name="sorter", capacity=max_pending_actuations)
 
-        # Set up GPIO
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.servo_pin, GPIO.OUT)
-        self.servo = GPIO.PWM(self.servo_pin, 50)  # 50Hz PWM frequency
-        self.servo.start(0)  # Initialize with 0% duty cycle
+        # Set up the servo; its pulse release runs on the same scheduler
+        self.servo = ServoDriver(self.servo_pin, profile=servo_profile, scheduler=self.scheduler)
 
-        # Move servo to the default position
+        # Move servo to the default position and wait for it, the starting position is unknown
         self.move_to_angle(self.default_angle)
+        self.servo.wait_until_ready()
 
-    def calculate_travel_time(self):
+    def calculate_travel_time(self, travelled=0.0):
         """
         Calculate the travel time from the camera to the flapper based on conveyor speed.
 
+        :param travelled: Meters the part had already moved past the middle of the view when captured.
         :return: Travel time in seconds.
         """
         if self.conveyor and self.conveyor.speed > 0:
-            return self.distance_to_flapper / self.conveyor.speed
+            return max(0.0, self.distance_to_flapper - travelled) / self.conveyor.speed
         else:
             raise ValueError("Conveyor speed must be greater than 0.")
 
     def move_to_angle(self, angle):
         """
-        Move the servo to a specific angle (between 0 and 180 degrees).
+        Start moving the servo to a specific angle (between 0 and 180 degrees) without blocking.
 
         :param angle: Target angle for the servo.
+        :return: time.monotonic() at which the servo will have settled.
         """
-        duty_cycle = (angle / 18) + 2  # Convert angle to duty cycle
-        self.servo.ChangeDutyCycle(duty_cycle)
-        print(f"Moving servo to {angle} degrees.")
-        time.sleep(0.5)  # Allow the servo to reach the target position
+        ready_at = self.servo.move(angle)
+        print(f"Moving servo to {angle} degrees (settled in {ready_at - time.monotonic():.2f} s).")
+        return ready_at
+
+    def _angle_for(self, object_type):
+        if object_type == "bolt":
+            return self.bolt_angle
+        elif object_type == "nut":
+            return self.nut_angle
+        return None
 
-    def actuate_flapper(self, object_type):
+    def _gate_index(self, object_type):
+        """Event log gate index: 0 for the bolt side, 1 for the nut side."""
+        if object_type == "bolt":
+            return 0
+        elif object_type == "nut":
+            return 1
+        return NO_GATE
+
+    def _log_event(self, event, gate, actual_time, status):
+        if self.event_log and event:
+            detection = event["detection"] or {}
+            self.event_log.log(event["frame_id"], event["captured_at"], event["due_at"], actual_time,
+                               detection.get("class_id", 0), detection.get("confidence", 0.0),
+                               detection.get("bbox", (0, 0, 0, 0)), gate=gate, status=status,
+                               part_id=event["part_id"])
+
+    def actuate_flapper(self, object_type, event=None):
         """
         Actuate the flapper based on the object type (either 'bolt' or 'nut').
 
         :param object_type: The detected object type ('bolt' or 'nut').
+        :param event: Event log context from handle_detection (frame id, capture and due times, detection).
         """
-        if object_type == "bolt":
-            print("Sorting a bolt...")
-            self.move_to_angle(self.bolt_angle)
-        elif object_type == "nut":
-            print("Sorting a nut...")
-            self.move_to_angle(self.nut_angle)
-        else:
+        angle = self._angle_for(object_type)
+        if angle is None:
             print("Unknown object type detected. Skipping sorting.")
+            self._log_event(event, NO_GATE, None, STATUS_PASSED)
             return
 
-        # Start a timer to return servo to default position after hold time
+        print(f"Sorting a {object_type}...")
+        ready_at = self.move_to_angle(angle)
+        if event:
+            # Lateness (ready_at vs. due_at) is judged by the query, with a tolerance for timer jitter
+            self._log_event(event, self._gate_index(object_type), ready_at, STATUS_SORTED)
+
+        # Return servo to default position once it has settled and held
         print(f"Hold time: {self.hold_time:.2f} seconds.")
-        Timer(self.hold_time, self.move_to_angle, args=(self.default_angle,)).start()
+        self.scheduler.schedule_at(ready_at + self.hold_time, self.move_to_angle, self.default_angle)
 
-    def handle_detection(self, detected_classes):
+    def handle_detection(self, detected_classes, captured_at=None, detections=None, frame_id=0, frame_shape=None):
         """
         Handle object detection result and perform sorting.
 
         :param detected_classes: List of detected classes (e.g., ['bolt', 'nut']).
+        :param captured_at: time.monotonic() when the frame was captured; detection latency is
+                            subtracted from the travel time when given.
+        :param detections: Detector output dicts matching `detected_classes`, for the event log and,
+                           with `frame_shape`, for the part's position on the belt.
+        :param frame_id: Frame the detections came from, for the event log.
+        :param frame_shape: (height, width) of the frame the bounding boxes are in.
         """
-        travel_time = self.calculate_travel_time()
-
-        for detected_class in detected_classes:
-            print(f"Detected: {detected_class}. Actuation in {travel_time:.2f} seconds.")
-            Timer(travel_time, self.actuate_flapper, args=(detected_class,)).start()
+        now = time.monotonic()
+        latency = 0.0 if captured_at is None else now - captured_at
+
+        for index, detected_class in enumerate(detected_classes):
+            detection = detections[index] if detections else None
+            travelled = 0.0
+            if self.fov_length and frame_shape and detection and "bbox" in detection:
+                travelled = distance_past_center(detection["bbox"], frame_shape, self.fov_length)
+            travel_time = max(0.0, self.calculate_travel_time(travelled) - latency)
+            part_id = 0
+            if self.tracker:
+                # Every observation agrees on when the part crossed the middle of the view
+                part_id = self.tracker.part_id(detected_class, now - latency - travelled / self.conveyor.speed)
+            event = {
+                "frame_id": frame_id,
+                "part_id": part_id,
+                "captured_at": now if captured_at is None else captured_at,
+                "due_at": now + travel_time,
+                "detection": detection,
+            }
+
+            # Start the move early enough for the flapper to be in place when the part arrives. It moves
+            # from wherever it was last sent (possibly the other side), not necessarily from default_angle
+            angle = self._angle_for(detected_class)
+            with self.servo.lock:
+                commanded_angle = self.servo.target_angle
+            lead_time = self.servo.predict_move_time(angle, commanded_angle) if angle is not None else 0.0
+            delay = max(0.0, travel_time - lead_time)
+            if not self.scheduler.admit():
+                print(f"Detected: {detected_class}. Actuation queue full, dropping it.")
+                self._log_event(event, self._gate_index(detected_class), None,
+                                STATUS_PASSED if angle is None else STATUS_MISSED)
+                continue
+            print(f"Detected: {detected_class}. Actuation in {delay:.2f} seconds.")
+            self.scheduler.schedule_in(delay, self.actuate_flapper, detected_class, event)
+
+    @property
+    def schedulers(self):
+        """Actuation schedulers by name, for queue depth and drop reporting."""
+        return {"sorter": self.scheduler}
 
     def cleanup(self):
         """
-        Clean up GPIO and stop the servo.
+        Stop the servo and release its GPIO pin (other pins, e.g. of other lanes, are left alone).
         """
+        self.scheduler.stop()
         self.move_to_angle(self.default_angle)  # Ensure servo returns to default
+        self.servo.wait_until_ready()
         self.servo.stop()
-        GPIO.cleanup()
+        GPIO.cleanup(self.servo_pin)
 
 
 # Example usage
@@ -129,9 +221,11 @@ if __name__ == "__main__":
 # Dynamic Travel Time Calculation:
 
 # The calculate_travel_time method calculates the travel time based on the conveyor's current speed and the distance to the flapper.
-# Timer for Actuation:
+# Scheduled Actuation:
 
-# Uses Python's Timer to delay flapper actuation until the detected object reaches the flapper.
+# Flapper moves and returns run on one ActuationScheduler thread instead of a threading.Timer per
+# detection. Its capacity bounds the pending commands; detections beyond it are dropped, logged as
+# missed and counted in the pipeline stats.
 # Synchronization with Conveyor:
 
 # The sorter adjusts automatically when the conveyor speed changes.
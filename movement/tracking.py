@@ -0,0 +1,50 @@
+import threading
+
+
+class PartTracker:
+    def __init__(self, new_part_id, match_window=0.1, horizon=2.0):
+        """
+        Give every observation of the same part the same part id.
+
+        The rate policy infers each part a few times while it crosses the view. Corrected for the part's
+        position in the frame (fov_length), those observations agree on when the part crossed the middle
+        of the view, so an observation of the same class within `match_window` of a recently seen part
+        is that part.
+
+        :param new_part_id: Callable returning a fresh id (e.g. EventLogWriter.new_part_id).
+        :param match_window: Seconds two observations' crossing times may differ and still be the same part.
+        :param horizon: Seconds a part is remembered after it crossed the middle of the view.
+        """
+        self.new_part_id = new_part_id
+        self.match_window = match_window
+        self.horizon = horizon
+        self.parts = []  # [part_id, class_name, crossed_at]
+        self.lock = threading.Lock()
+
+    def part_id(self, class_name, crossed_at):
+        """
+        Id of the part an observation belongs to, allocating a new one for a part not seen yet.
+
+        :param class_name: Detected class.
+        :param crossed_at: time.monotonic() at which the part was in the middle of the view.
+        :return: Part id.
+        """
+        with self.lock:
+            self.parts = [part for part in self.parts if part[2] + self.horizon >= crossed_at]
+            matches = [part for part in self.parts
+                       if part[1] == class_name and abs(part[2] - crossed_at) <= self.match_window]
+            if matches:
+                part = min(matches, key=lambda part: abs(part[2] - crossed_at))
+                part[2] = crossed_at  # Follow the newest estimate
+                return part[0]
+            part_id = self.new_part_id()
+            self.parts.append([part_id, class_name, crossed_at])
+            return part_id
+
+
+# Notes:
+# Why Not Deduplicate Actuations:
+
+# Part ids only label the event log so per-part throughput can be counted (events/query.py). Every
+# observation is still actuated for: the gate router merges them into one opening, and a later
+# observation can correct an earlier one's misread class.
@@ -0,0 +1,282 @@
+import threading
+import time
+from collections import deque
+
+EDGE_POLICIES = ("block", "drop_oldest", "drop_newest", "coalesce_latest")
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Edge:
+    def __init__(self, name, maxsize=8, policy="block"):
+        """
+        Bounded queue between two stages.
+
+        :param name: Edge name, usually "<source>-><destination>".
+        :param maxsize: Maximum number of queued items.
+        :param policy: What a full edge does with a new item:
+                       'block' waits for space, 'drop_oldest' evicts the oldest item,
+                       'drop_newest' discards the new item, 'coalesce_latest' keeps only the newest item.
+        """
+        if policy not in EDGE_POLICIES:
+            raise ValueError(f"Unknown edge policy '{policy}'. Use one of {EDGE_POLICIES}.")
+        self.name = name
+        self.maxsize = 1 if policy == "coalesce_latest" else maxsize
+        self.policy = policy
+        self.items = deque()  # (enqueue_time, item)
+        self.condition = threading.Condition()
+        self.closed = False
+
+        self.put_count = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.wait_times = deque(maxlen=256)  # Seconds items spent queued
+
+    def put(self, item):
+        """
+        Add an item according to the edge policy.
+
+        :param item: Item to pass downstream.
+        :return: False if the item (or the edge) was discarded, True otherwise.
+        """
+        with self.condition:
+            if self.policy == "block":
+                while len(self.items) >= self.maxsize and not self.closed:
+                    self.condition.wait(timeout=0.1)
+            if self.closed:
+                return False
+            if len(self.items) >= self.maxsize:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                self.items.popleft()  # drop_oldest and coalesce_latest replace the stale item
+                self.dropped += 1
+
+            self.items.append((time.monotonic(), item))
+            self.put_count += 1
+            self.max_depth = max(self.max_depth, len(self.items))
+            self.condition.notify_all()
+            return True
+
+    def get(self, timeout=0.1):
+        """
+        Take the oldest item.
+
+        :param timeout: Seconds to wait for an item.
+        :return: The item, or None if nothing arrived in time.
+        """
+        with self.condition:
+            if not self.items:
+                self.condition.wait(timeout=timeout)
+            if not self.items:
+                return None
+            enqueued_at, item = self.items.popleft()
+            self.wait_times.append(time.monotonic() - enqueued_at)
+            self.condition.notify_all()
+            return item
+
+    def close(self):
+        """Wake up blocked producers and consumers; further puts are discarded."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            return {
+                "policy": self.policy,
+                "depth": len(self.items),
+                "max_depth": self.max_depth,
+                "maxsize": self.maxsize,
+                "put": self.put_count,
+                "dropped": self.dropped,
+                "wait_p50_ms": _percentile(self.wait_times, 0.5) * 1000,
+                "wait_p95_ms": _percentile(self.wait_times, 0.95) * 1000,
+            }
+
+
+class Stage:
+    def __init__(self, name, function, workers=1, source=False):
+        """
+        One processing step of a Pipeline.
+
+        :param name: Stage name.
+        :param function: Called with each input item (no argument for sources); returns the item to
+                         send downstream, or None to emit nothing.
+        :param workers: Number of worker threads running `function` concurrently.
+        :param source: True for stages without an input edge (e.g. camera capture).
+        """
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.source = source
+        self.input = None
+        self.outputs = []
+        self.threads = []
+        self.lock = threading.Lock()
+
+        self.processed = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=256)  # Seconds spent inside `function`
+
+    def _worker(self, pipeline):
+        while pipeline.running:
+            if self.source:
+                item = None
+            else:
+                item = self.input.get()
+                if item is None:
+                    continue
+
+            start = time.perf_counter()
+            try:
+                result = self.function() if self.source else self.function(item)
+            except Exception as e:
+                with self.lock:
+                    self.errors += 1
+                print(f"Error in {self.name} stage: {e}")
+                continue
+            with self.lock:
+                self.latencies.append(time.perf_counter() - start)
+                self.processed += 1
+
+            if result is not None:
+                for edge in self.outputs:
+                    edge.put(result)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "processed": self.processed,
+                "errors": self.errors,
+                "latency_p50_ms": _percentile(self.latencies, 0.5) * 1000,
+                "latency_p95_ms": _percentile(self.latencies, 0.95) * 1000,
+            }
+
+
+class Pipeline:
+    def __init__(self):
+        """
+        Stages linked by bounded edges, each stage running on its own worker threads.
+        """
+        self.stages = {}
+        self.edges = []
+        self.monitors = {}  # name -> callable returning queue stats of a resource outside the pipeline
+        self.running = False
+
+    def add_stage(self, name, function, workers=1, source=False):
+        """
+        Add a stage. See Stage for the parameters.
+
+        :return: The Stage.
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already exists.")
+        self.stages[name] = Stage(name, function, workers=workers, source=source)
+        return self.stages[name]
+
+    def connect(self, source, destination, maxsize=8, policy="block"):
+        """
+        Link two stages with a bounded edge. A stage sends each result to all of its output edges.
+
+        :param source: Name of the producing stage.
+        :param destination: Name of the consuming stage (one input edge per stage).
+        :param maxsize: Maximum queued items.
+        :param policy: Edge policy, see Edge.
+        :return: The Edge.
+        """
+        destination_stage = self.stages[destination]
+        if destination_stage.source or destination_stage.input is not None:
+            raise ValueError(f"Stage '{destination}' already has an input.")
+        edge = Edge(f"{source}->{destination}", maxsize=maxsize, policy=policy)
+        self.stages[source].outputs.append(edge)
+        destination_stage.input = edge
+        self.edges.append(edge)
+        return edge
+
+    def add_monitor(self, name, stats_function):
+        """
+        Report a bounded queue fed by the pipeline (e.g. an ActuationScheduler) alongside the edges.
+
+        :param name: Name shown in the stats.
+        :param stats_function: Callable returning a dict with "depth", "max_depth", "capacity", "admitted"
+                               and "dropped" (see ActuationScheduler.stats).
+        """
+        self.monitors[name] = stats_function
+
+    def start(self):
+        """Start every stage's worker threads."""
+        for stage in self.stages.values():
+            if not stage.source and stage.input is None:
+                raise ValueError(f"Stage '{stage.name}' has no input edge.")
+        self.running = True
+        for stage in self.stages.values():
+            stage.threads = [
+                threading.Thread(target=stage._worker, args=(self,), name=f"{stage.name}-{i}", daemon=True)
+                for i in range(stage.workers)
+            ]
+            for thread in stage.threads:
+                thread.start()
+
+    def stop(self):
+        """Stop all stages and wait for their threads."""
+        self.running = False
+        for edge in self.edges:
+            edge.close()
+        for stage in self.stages.values():
+            for thread in stage.threads:
+                if thread is not threading.current_thread():
+                    thread.join(timeout=2)
+
+    def stats(self):
+        """
+        Depth, drop and latency accounting for every stage and edge.
+
+        :return: Dict with "stages", "edges" and "monitors" sub-dicts keyed by name.
+        """
+        return {
+            "stages": {name: stage.stats() for name, stage in self.stages.items()},
+            "edges": {edge.name: edge.stats() for edge in self.edges},
+            "monitors": {name: stats_function() for name, stats_function in self.monitors.items()},
+        }
+
+    def format_stats(self):
+        """
+        Multi-line summary of `stats()` for console output.
+        """
+        stats = self.stats()
+        lines = ["Pipeline:"]
+        for name, s in stats["stages"].items():
+            lines.append(f"  stage {name:<10} x{s['workers']} processed={s['processed']} errors={s['errors']} "
+                         f"p50={s['latency_p50_ms']:.1f} ms p95={s['latency_p95_ms']:.1f} ms")
+        for name, e in stats["edges"].items():
+            lines.append(f"  edge  {name:<20} {e['policy']:<15} depth={e['depth']}/{e['maxsize']} "
+                         f"max={e['max_depth']} dropped={e['dropped']}/{e['put']} "
+                         f"wait p50={e['wait_p50_ms']:.1f} ms p95={e['wait_p95_ms']:.1f} ms")
+        for name, m in stats["monitors"].items():
+            capacity = "unbounded" if m["capacity"] is None else m["capacity"]
+            lines.append(f"  queue {name:<20} depth={m['depth']}/{capacity} max={m['max_depth']} "
+                         f"dropped={m['dropped']}/{m['admitted'] + m['dropped']}")
+        return "\n".join(lines)
+
+
+# Notes:
+# Bounded Edges:
+
+# Every edge has a fixed maxsize, so overload shows up as drops counted in the stats instead of
+# unbounded memory growth. Pick 'coalesce_latest' where only the newest item matters (camera frames),
+# 'block' where every item matters and the consumer is fast (sort commands).
+# Stall Isolation:
+
+# A producer only ever waits on a 'block' edge; with any other policy a stalled consumer cannot
+# freeze the stage feeding it.
+# Actuation Queues:
+
+# The dispatch stage hands parts to ActuationSchedulers, which admit new work only up to their capacity;
+# add_monitor() puts their depth and drops next to the edge stats so overload is visible end to end.
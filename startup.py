@@ -0,0 +1,220 @@
+import importlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LazyModule:
+    def __init__(self, module_name):
+        """
+        Stand-in for a module that is only imported on first attribute access.
+
+        :param module_name: Fully qualified module name (e.g. 'RPi.GPIO').
+        """
+        self._module_name = module_name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._module_name)
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._module_name} ({state})>"
+
+
+def lazy_import(module_name):
+    """
+    Return a proxy that imports `module_name` the first time it is used.
+
+    Hardware and accelerator modules (cv2, RPi.GPIO, hailo_platform) are slow to import
+    and are not installed on every machine, so tools that never touch them should not pay
+    for them at import time.
+
+    :param module_name: Fully qualified module name.
+    :return: LazyModule proxy.
+    """
+    return LazyModule(module_name)
+
+
+class StartupOrchestrator:
+    def __init__(self, max_workers=None):
+        """
+        Bring up independent subsystems concurrently and time each of them.
+
+        :param max_workers: Maximum number of components initialized at once (default: one per component).
+        """
+        self.max_workers = max_workers
+        self.components = {}  # name -> {"factory", "depends_on", "cleanup", "resume"}
+        self.instances = {}
+        self.timings = {}  # name -> seconds spent in the component's own factory
+        self.total_time = 0.0
+
+    def register(self, name, factory, depends_on=(), cleanup=None, resume=None):
+        """
+        Register a component.
+
+        :param name: Unique component name.
+        :param factory: Callable receiving a dict of its started dependencies and returning the instance.
+        :param depends_on: Names of components that must be up before this one starts.
+        :param cleanup: Optional callable receiving the instance, used on restart and shutdown.
+        :param resume: Optional callable receiving the new instance and the one it replaces, run after a
+                       restart so the component picks up where the old one stopped (e.g. the belt speed).
+                       Factories only construct components; whatever the application started on top of
+                       them (belt motion, capture threads) has to be started again here.
+        """
+        if name in self.components:
+            raise ValueError(f"Component '{name}' is already registered.")
+        for dependency in depends_on:
+            if dependency not in self.components:
+                raise ValueError(f"Component '{name}' depends on unknown component '{dependency}'.")
+        self.components[name] = {
+            "factory": factory,
+            "depends_on": tuple(depends_on),
+            "cleanup": cleanup,
+            "resume": resume,
+        }
+
+    def _start_component(self, name, dependency_events):
+        component = self.components[name]
+        try:
+            # Inside the try so a failed dependency still releases whatever waits on this component
+            for dependency in component["depends_on"]:
+                dependency_events[dependency].wait()
+                if dependency not in self.instances:
+                    raise RuntimeError(f"Cannot start '{name}': dependency '{dependency}' failed.")
+
+            start = time.perf_counter()
+            deps = {dependency: self.instances[dependency] for dependency in component["depends_on"]}
+            self.instances[name] = component["factory"](deps)
+            self.timings[name] = time.perf_counter() - start
+        finally:
+            dependency_events[name].set()
+        return self.instances[name]
+
+    def start(self, names=None):
+        """
+        Initialize components concurrently, respecting declared dependencies.
+
+        :param names: Component names to start (default: all registered components).
+        :return: Dict of component name to instance.
+        """
+        names = list(self.components) if names is None else list(names)
+        pending = list(names)
+        while pending:  # Pull in dependencies that are not running yet
+            for dependency in self.components[pending.pop()]["depends_on"]:
+                if dependency not in names and dependency not in self.instances:
+                    names.append(dependency)
+                    pending.append(dependency)
+        names = [name for name in self.components if name in names]
+
+        self.timings = {}
+        dependency_events = {name: threading.Event() for name in self.components}
+        for name in self.components:
+            if name not in names and name in self.instances:
+                dependency_events[name].set()  # Already running, nothing to wait for
+
+        print(f"Starting components: {', '.join(names)}")
+        start = time.perf_counter()
+        errors = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers or len(names) or 1) as pool:
+            futures = {name: pool.submit(self._start_component, name, dependency_events) for name in names}
+            for name, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    errors[name] = e
+                    print(f"Error starting {name}: {e}")
+        self.total_time = time.perf_counter() - start
+
+        if errors:
+            raise RuntimeError(f"Failed to start components: {', '.join(errors)}") from next(iter(errors.values()))
+        return {name: self.instances[name] for name in names}
+
+    def _dependents(self, names):
+        affected = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for name, component in self.components.items():
+                if name not in affected and affected.intersection(component["depends_on"]):
+                    affected.add(name)
+                    changed = True
+        return [name for name in self.components if name in affected]
+
+    def stop(self, names=None):
+        """
+        Clean up running components in reverse registration order.
+
+        :param names: Component names to stop (default: all running components).
+        """
+        names = list(self.instances) if names is None else list(names)
+        for name in reversed(list(self.components)):
+            if name not in names or name not in self.instances:
+                continue
+            instance = self.instances.pop(name)
+            cleanup = self.components[name]["cleanup"]
+            if cleanup:
+                try:
+                    cleanup(instance)
+                except Exception as e:
+                    print(f"Error cleaning up {name}: {e}")
+
+    def restart(self, *names):
+        """
+        Restart the given components (and anything depending on them) after a fault.
+
+        Unaffected components keep running, so recovery costs roughly the slowest
+        restarted component rather than a full sequential bring-up.
+
+        :param names: Component names to restart (default: all components).
+        :return: Dict of restarted component name to instance.
+        """
+        affected = self._dependents(names or self.components)
+        print(f"Restarting components: {', '.join(affected)}")
+        previous = {name: self.instances[name] for name in affected if name in self.instances}
+        self.stop(affected)
+        restarted = self.start(affected)
+        for name in affected:  # Registration order, so a belt is moving again before its sorter resumes
+            resume = self.components[name]["resume"]
+            if resume and name in previous:
+                try:
+                    resume(restarted[name], previous[name])
+                except Exception as e:
+                    print(f"Error resuming {name}: {e}")
+        return restarted
+
+    def report(self):
+        """
+        Format the per-component startup timing breakdown of the last start or restart.
+
+        :return: Multi-line report string.
+        """
+        lines = ["Startup timing:"]
+        for name, seconds in sorted(self.timings.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"  {name:<12} {seconds * 1000:8.1f} ms")
+        sequential = sum(self.timings.values())
+        lines.append(f"  {'total':<12} {self.total_time * 1000:8.1f} ms (sequential: {sequential * 1000:.1f} ms)")
+        return "\n".join(lines)
+
+
+# Notes:
+# Lazy Imports:
+
+# lazy_import() returns a proxy module so `GPIO = lazy_import("RPi.GPIO")` keeps every existing
+# `GPIO.setup(...)` call site unchanged while deferring the import until the first call.
+# Concurrent Bring-up:
+
+# Each component runs its factory on a worker thread and blocks only on the components it declares
+# in depends_on, so camera open, model load and servo homing overlap.
+# Restart After a Fault:
+
+# restart("camera") tears down and re-creates only the camera and its dependents, then runs each
+# component's resume hook so belts and capture threads come back in the state the application left them.